@@ -0,0 +1,193 @@
+"""
+Buffered bet ingestion
+Coalesces concurrent bet submissions into one multi-row INSERT per tenant
+"""
+import os
+import uuid
+import asyncio
+import logging
+from collections import defaultdict
+from typing import List, Optional, Sequence, Tuple
+
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+BET_INGEST_WAIT_TIME = float(os.getenv("BET_INGEST_WAIT_TIME", "0.1"))  # seconds
+BET_INGEST_MAX_ROWS = int(os.getenv("BET_INGEST_MAX_ROWS", "1000"))
+BET_INGEST_SHUTDOWN_TIMEOUT = float(os.getenv("BET_INGEST_SHUTDOWN_TIMEOUT", "10"))  # seconds
+
+# (category_id, user_name, user_email, bet_value, amount)
+BetRow = Tuple[str, str, str, str, float]
+
+class CategoryChangedError(Exception):
+    """A bet's category was deactivated or repriced after the submission was priced"""
+
+class BetIngestor:
+    """Buffers bet submissions and writes each tenant's share of a batch in one statement"""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self):
+        """Start the background batching task"""
+        if self._task:
+            return
+
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Bet ingestor started")
+
+    async def submit(self, tenant_id: str, rows: Sequence[BetRow]) -> List[str]:
+        """Queue one submission's bets and return their ids once committed"""
+        if self._closing:
+            raise RuntimeError("Bet ingestor is shutting down")
+
+        rows = [(str(uuid.uuid4()), *row) for row in rows]
+        future = asyncio.get_running_loop().create_future()
+
+        if self._task:
+            # No await between the closing check and the enqueue, so nothing
+            # can land behind the shutdown marker
+            self._queue.put_nowait((tenant_id, rows, future))
+        else:
+            # Not started (e.g. scripts/tests): write straight through
+            await self._flush(tenant_id, [(rows, future)])
+
+        await future
+        return [row[0] for row in rows]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            # None is the shutdown marker queued by stop()
+            item = await self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            row_count = len(item[1])
+            deadline = loop.time() + BET_INGEST_WAIT_TIME
+
+            # Keep collecting until the wait window closes or the batch is full
+            while row_count < BET_INGEST_MAX_ROWS:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                row_count += len(item[1])
+
+            # RLS context is per connection, so each tenant gets its own insert
+            by_tenant = defaultdict(list)
+            for tenant_id, rows, future in batch:
+                by_tenant[tenant_id].append((rows, future))
+
+            try:
+                await asyncio.gather(*(
+                    self._flush(tenant_id, submissions)
+                    for tenant_id, submissions in by_tenant.items()
+                ))
+            finally:
+                # Only reached with unresolved futures if the flush was cancelled
+                # by a shutdown timeout; callers get an error instead of hanging
+                self._fail_pending(
+                    [future for _, _, future in batch],
+                    RuntimeError("Bet ingestor stopped before the bets were written")
+                )
+
+    @staticmethod
+    def _fail_pending(futures: list, error: Exception):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _flush(self, tenant_id: str, submissions: list):
+        """Insert a tenant's submissions, isolating failures to the submission that caused them"""
+        errors = {}
+        try:
+            async with db_manager.get_tenant_connection(tenant_id) as conn:
+                try:
+                    async with conn.transaction():
+                        await self._insert(conn, tenant_id, [row for rows, _ in submissions for row in rows])
+                except Exception as e:
+                    if len(submissions) == 1:
+                        raise
+                    logger.warning("Batched bet insert failed, retrying per submission: %s", e)
+
+                    # One savepoint per submission keeps each submission all-or-nothing
+                    for index, (rows, _) in enumerate(submissions):
+                        try:
+                            async with conn.transaction():
+                                await self._insert(conn, tenant_id, rows)
+                        except Exception as e:
+                            errors[index] = e
+        except Exception as e:
+            logger.error("Failed to write bets for tenant %s: %s", tenant_id, e)
+            errors = {index: e for index in range(len(submissions))}
+
+        # Resolve only after the enclosing transaction has committed
+        for index, (_, future) in enumerate(submissions):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
+
+    @staticmethod
+    async def _insert(conn, tenant_id: str, rows: list):
+        # Prices are checked against cached values before queuing; the join
+        # re-checks them against the committed category so a bet priced by a
+        # stale cache on any worker is rejected rather than written
+        result = await conn.execute("""
+            INSERT INTO bets (
+                id, tenant_id, category_id, user_name, user_email,
+                bet_value, amount
+            )
+            SELECT b.id, $1, b.category_id, b.user_name, b.user_email, b.bet_value, b.amount
+            FROM unnest($2::uuid[], $3::uuid[], $4::text[], $5::text[], $6::text[], $7::numeric[])
+                AS b(id, category_id, user_name, user_email, bet_value, amount)
+            JOIN raffle_categories c
+                ON c.tenant_id = $1 AND c.id = b.category_id
+                AND c.is_active = true AND c.bet_price = b.amount
+        """, tenant_id, *(list(column) for column in zip(*rows)))
+
+        # Status is "INSERT 0 <rows>"; raising rolls the statement back so the
+        # submission stays all-or-nothing
+        if int(result.split()[-1]) != len(rows):
+            raise CategoryChangedError("A category was deactivated or repriced")
+
+    async def stop(self):
+        """Stop accepting bets, write everything already queued, then stop the batching task"""
+        self._closing = True
+        if not self._task:
+            return
+
+        # Items queued before the marker are batched and flushed as usual
+        self._queue.put_nowait(None)
+        done, _ = await asyncio.wait([self._task], timeout=BET_INGEST_SHUTDOWN_TIMEOUT)
+        if not done:
+            logger.error("Bet ingestor did not drain within %ss, cancelling", BET_INGEST_SHUTDOWN_TIMEOUT)
+            self._task.cancel()
+            await asyncio.wait([self._task])
+        self._task = None
+
+        # Anything still queued never reached the database
+        error = RuntimeError("Bet ingestor stopped before the bets were written")
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                self._fail_pending([item[2]], error)
+
+# Global ingestor instance
+bet_ingestor = BetIngestor()
@@ -0,0 +1,110 @@
+"""
+Caching helpers for hot, rarely-changing reads
+In-process TTL cache plus an optional shared Redis client
+"""
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+try:
+    import redis.asyncio as aioredis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_redis_client = None
+
+def get_redis():
+    """Shared Redis client, or None when Redis isn't installed/configured"""
+    global _redis_client
+    if _redis_client is None and HAS_REDIS and REDIS_URL:
+        _redis_client = aioredis.from_url(REDIS_URL)
+    return _redis_client
+
+async def close_redis():
+    """Close the shared Redis client"""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+
+async def get_shared(key: str, local: "TTLCache") -> Optional[bytes]:
+    """Cached bytes from Redis, or from the local cache without Redis"""
+    redis = get_redis()
+    if redis is None:
+        return local.get(key)
+
+    try:
+        return await redis.get(key)
+    except Exception as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return None
+
+async def set_shared(key: str, body: bytes, local: "TTLCache") -> None:
+    """Store bytes for local.ttl seconds, in Redis when configured so every worker sees them"""
+    redis = get_redis()
+    if redis is None:
+        local.set(key, body)
+        return
+
+    try:
+        await redis.set(key, body, ex=int(local.ttl))
+    except Exception as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+async def invalidate_shared(key: str, local: "TTLCache") -> None:
+    """Drop a cached entry after a write; with Redis the drop is visible to every worker"""
+    local.pop(key)
+    redis = get_redis()
+    if redis is not None:
+        try:
+            await redis.delete(key)
+        except Exception as e:
+            logger.warning("Cache invalidation failed for %s: %s", key, e)
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value, or default if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value, evicting the least recently used entry when full"""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return an entry (used for invalidation on writes)"""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,23 +4,90 @@ Multi-tenant database configuration and connection management
 import os
 import aiosqlite
 import asyncio
+from functools import lru_cache
 from typing import Optional, Dict, Any
 from contextlib import asynccontextmanager
 import logging
 
+try:
+    import asyncpg
+    HAS_ASYNCPG = True
+except ImportError:
+    HAS_ASYNCPG = False
+
 logger = logging.getLogger(__name__)
 
+# Set when connecting through PgBouncer in transaction pooling mode
+PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+# asyncpg pool tuning, used when DATABASE_URL points at PostgreSQL
+# Every worker opens its own pool, so the per-worker size is derived from a
+# total connection budget shared by all workers. The default budget leaves
+# headroom under PostgreSQL's stock max_connections=100 for admin sessions
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+# Same default as the uvicorn launcher in main.py
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", str(max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY))))
+PG_POOL_SETTINGS = {
+    "min_size": min(int(os.getenv("DB_POOL_MIN_SIZE", "2")), _POOL_MAX_SIZE),
+    "max_size": _POOL_MAX_SIZE,
+    # Recycle backends periodically so catalog/plan caches don't grow unbounded
+    "max_queries": int(os.getenv("DB_POOL_MAX_QUERIES", "50000")),
+    "max_inactive_connection_lifetime": float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300")),
+    # PgBouncer in transaction mode can't keep server-side prepared statements
+    # across pooled backends, so the statement cache is disabled behind it
+    "statement_cache_size": 0 if PGBOUNCER else int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024")),
+    # Static SQL text means cached statements never go stale; keep them for the connection's life
+    "max_cached_statement_lifetime": 0,
+    "command_timeout": float(os.getenv("DB_COMMAND_TIMEOUT", "60")),
+    "server_settings": {
+        "application_name": "baby_raffle_saas",
+        "timezone": "UTC",
+        "jit": "off",
+    },
+}
+POOL_STATS_INTERVAL = int(os.getenv("DB_POOL_STATS_INTERVAL", "60"))  # seconds, 0 disables
+
+# Number of compiled statements sqlite3 keeps per connection
+STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "512"))
+
+# Connection PRAGMAs applied once at connect time
+SQLITE_PRAGMAS = {
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", "268435456")),  # 256MB
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # 64MB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # ms
+    # Per-connection in SQLite; ON DELETE CASCADE relies on it
+    "foreign_keys": "ON",
+}
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+
+@lru_cache(maxsize=512)
+def _inject_tenant(query: str, has_where: bool) -> str:
+    """Append a filter on a bound tenant_id parameter to a query ending in its WHERE clause"""
+    if has_where:
+        return f"{query} AND tenant_id = ?"
+    return f"{query} WHERE tenant_id = ?"
+
 class DatabaseManager:
     def __init__(self):
         self.connection: Optional[aiosqlite.Connection] = None
+        self.pool = None
         self.database_url = os.getenv(
             "DATABASE_URL", 
             "sqlite:///./baby_raffle.db"
         )
+        self.is_postgres = self.database_url.startswith(("postgres://", "postgresql://"))
         self._initialized = False
+        self._stats_task: Optional[asyncio.Task] = None
     
     async def create_connection(self):
         """Create database connection"""
+        if self.is_postgres:
+            await self.create_pool()
+            return
+        
         try:
             # Extract database path from URL
             if self.database_url.startswith("sqlite:///"):
@@ -28,13 +95,80 @@ class DatabaseManager:
             else:
                 db_path = "./baby_raffle.db"  # Default fallback
             
-            self.connection = await aiosqlite.connect(db_path)
+            self.connection = await aiosqlite.connect(
+                db_path, cached_statements=STATEMENT_CACHE_SIZE
+            )
             self.connection.row_factory = aiosqlite.Row
+            await self._apply_pragmas(db_path)
             logger.info("Database connection created successfully")
         except Exception as e:
             logger.error(f"Failed to create database connection: {e}")
             raise
     
+    async def create_pool(self):
+        """Create asyncpg connection pool"""
+        if not HAS_ASYNCPG:
+            raise RuntimeError("asyncpg is required for PostgreSQL DATABASE_URL")
+        
+        try:
+            if WEB_CONCURRENCY * PG_POOL_SETTINGS['max_size'] > DB_MAX_CONNECTIONS:
+                logger.warning(
+                    f"{WEB_CONCURRENCY} workers x pool max_size {PG_POOL_SETTINGS['max_size']} "
+                    f"exceeds DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS}; "
+                    f"PostgreSQL may refuse connections under load"
+                )
+            
+            self.pool = await asyncpg.create_pool(
+                self.database_url,
+                init=self._init_pg_connection,
+                **PG_POOL_SETTINGS
+            )
+            logger.info(
+                f"Database pool created (min={PG_POOL_SETTINGS['min_size']}, "
+                f"max={PG_POOL_SETTINGS['max_size']})"
+            )
+        except Exception as e:
+            logger.error(f"Failed to create database pool: {e}")
+            raise
+    
+    @staticmethod
+    async def _init_pg_connection(conn):
+        """Per-connection setup, run once when the pool opens a backend"""
+        # Callers stringify ids anyway; skip building uuid.UUID objects per row
+        await conn.set_type_codec(
+            "uuid", encoder=str, decoder=str, schema="pg_catalog", format="text"
+        )
+    
+    def pool_stats(self) -> Optional[Dict[str, int]]:
+        """Current pool utilisation, or None without a pool"""
+        if not self.pool:
+            return None
+        return {
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "min": self.pool.get_min_size(),
+            "max": self.pool.get_max_size(),
+        }
+    
+    async def _log_pool_stats(self):
+        """Periodically log pool utilisation"""
+        while True:
+            await asyncio.sleep(POOL_STATS_INTERVAL)
+            stats = self.pool_stats()
+            logger.info(
+                f"Database pool: size={stats['size']} "
+                f"idle={stats['idle']} max={stats['max']}"
+            )
+    
+    async def _apply_pragmas(self, db_path: str):
+        """Tune SQLite for concurrent readers alongside a writer"""
+        # WAL needs a real file; in-memory databases keep their journal mode
+        if db_path != ":memory:" and not db_path.startswith("file::memory:"):
+            await self.connection.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        
+        for pragma, value in SQLITE_PRAGMAS.items():
+            await self.connection.execute(f"PRAGMA {pragma}={value}")
+    
     async def close_connection(self):
         """Close database connection"""
         if self.connection:
@@ -44,6 +178,13 @@ class DatabaseManager:
     @asynccontextmanager
     async def get_connection(self):
         """Get database connection"""
+        if self.is_postgres:
+            if not self.pool:
+                await self.create_pool()
+            async with self.pool.acquire() as connection:
+                yield connection
+            return
+        
         if not self.connection:
             await self.create_connection()
         
@@ -52,34 +193,71 @@ class DatabaseManager:
     @asynccontextmanager  
     async def get_tenant_connection(self, tenant_id: str):
         """Get database connection with tenant context"""
+        if self.is_postgres:
+            # Transaction-local setting so RLS sees the tenant and the value
+            # can't leak to the next user of the pooled connection
+            async with self.get_connection() as connection:
+                async with connection.transaction():
+                    await connection.execute(
+                        "SELECT set_config('app.current_tenant_id', $1, true)",
+                        tenant_id
+                    )
+                    yield connection
+            return
+        
         async with self.get_connection() as connection:
             # For SQLite, we'll implement tenant isolation through application logic
             # Store tenant_id in connection for filtering
             connection._tenant_id = tenant_id
             yield connection
     
-    async def execute_query(self, query: str, *args, tenant_id: Optional[str] = None) -> Any:
+    async def execute_query(
+        self, query: str, *args, tenant_id: Optional[str] = None,
+        has_where: Optional[bool] = None
+    ) -> Any:
         """Execute query with optional tenant context"""
-        async with self.get_connection() as connection:
+        if self.is_postgres:
+            # Tenant isolation is enforced by RLS policies
             if tenant_id:
-                # For SQLite, add WHERE clause for tenant isolation
-                if "SELECT" in query.upper() and "WHERE" not in query.upper():
-                    query = query.replace("FROM", f"FROM") + f" WHERE tenant_id = '{tenant_id}'"
-                elif "SELECT" in query.upper() and "WHERE" in query.upper():
-                    query = query + f" AND tenant_id = '{tenant_id}'"
+                async with self.get_tenant_connection(tenant_id) as connection:
+                    return await connection.fetch(query, *args)
+            async with self.get_connection() as connection:
+                return await connection.fetch(query, *args)
+        
+        async with self.get_connection() as connection:
+            if tenant_id and has_where is not None:
+                # SQLite has no RLS, so callers opt in to a tenant filter by
+                # declaring the query shape: has_where says whether the query
+                # already has a WHERE clause, which must be its last clause
+                # (no GROUP BY/ORDER BY/LIMIT after it). tenant_id is bound as
+                # a parameter so the statement text stays stable and cached
+                query = _inject_tenant(query, has_where)
+                args = (*args, tenant_id)
             
             cursor = await connection.execute(query, args)
             return await cursor.fetchall()
     
-    async def execute_one(self, query: str, *args, tenant_id: Optional[str] = None) -> Any:
+    async def execute_one(
+        self, query: str, *args, tenant_id: Optional[str] = None,
+        has_where: Optional[bool] = None
+    ) -> Any:
         """Execute query and return single result"""
-        async with self.get_connection() as connection:
+        if self.is_postgres:
             if tenant_id:
-                # For SQLite, add WHERE clause for tenant isolation
-                if "SELECT" in query.upper() and "WHERE" not in query.upper():
-                    query = query.replace("FROM", f"FROM") + f" WHERE tenant_id = '{tenant_id}'"
-                elif "SELECT" in query.upper() and "WHERE" in query.upper():
-                    query = query + f" AND tenant_id = '{tenant_id}'"
+                async with self.get_tenant_connection(tenant_id) as connection:
+                    return await connection.fetchrow(query, *args)
+            async with self.get_connection() as connection:
+                return await connection.fetchrow(query, *args)
+        
+        async with self.get_connection() as connection:
+            if tenant_id and has_where is not None:
+                # SQLite has no RLS, so callers opt in to a tenant filter by
+                # declaring the query shape: has_where says whether the query
+                # already has a WHERE clause, which must be its last clause
+                # (no GROUP BY/ORDER BY/LIMIT after it). tenant_id is bound as
+                # a parameter so the statement text stays stable and cached
+                query = _inject_tenant(query, has_where)
+                args = (*args, tenant_id)
             
             cursor = await connection.execute(query, args)
             return await cursor.fetchone()
@@ -92,23 +270,25 @@ class DatabaseManager:
         try:
             await self.create_connection()
             
+            if self.is_postgres:
+                # PostgreSQL schema (schema.sql) is applied by migrations
+                if POOL_STATS_INTERVAL > 0:
+                    self._stats_task = asyncio.create_task(self._log_pool_stats())
+                self._initialized = True
+                return
+            
             # Read and execute schema file
             schema_file = os.path.join(os.path.dirname(__file__), "schema_sqlite.sql")
             if os.path.exists(schema_file):
                 with open(schema_file, 'r') as f:
                     schema_sql = f.read()
                 
-                # Split by statements and execute each one
-                statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
-                
-                for statement in statements:
-                    if statement and not statement.startswith('--'):
-                        try:
-                            await self.connection.execute(statement)
-                        except Exception as e:
-                            # Skip errors for ALTER TABLE statements that might already exist
-                            if "duplicate column name" not in str(e).lower():
-                                logger.warning(f"Schema execution warning: {e}")
+                try:
+                    # Run the whole idempotent schema in a single call
+                    await self.connection.executescript(schema_sql)
+                except Exception as e:
+                    logger.warning(f"Schema script failed, falling back to per-statement execution: {e}")
+                    await self._execute_statements(schema_sql)
                 
                 await self.connection.commit()
                 logger.info("Database schema initialized successfully")
@@ -119,8 +299,31 @@ class DatabaseManager:
             logger.error(f"Failed to initialize database: {e}")
             raise
     
+    async def _execute_statements(self, schema_sql: str):
+        """Execute a schema one statement at a time, skipping already-applied ALTERs"""
+        statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
+        
+        for statement in statements:
+            if statement and not statement.startswith('--'):
+                try:
+                    await self.connection.execute(statement)
+                except Exception as e:
+                    # Skip errors for ALTER TABLE statements that might already exist
+                    if "duplicate column name" not in str(e).lower():
+                        logger.warning(f"Schema execution warning: {e}")
+    
     async def close(self):
         """Close database connection"""
+        if self._stats_task:
+            self._stats_task.cancel()
+            self._stats_task = None
+        
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+            self._initialized = False
+            logger.info("Database pool closed")
+        
         if self.connection:
             await self.connection.close()
             self.connection = None
@@ -0,0 +1,76 @@
+"""
+Write debouncing
+Coalesces bursts of writes to the same key into a single write of the latest value
+"""
+import os
+import copy
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+WRITE_DEBOUNCE_DELAY = float(os.getenv("WRITE_DEBOUNCE_DELAY", "0.2"))  # seconds
+
+class WriteDebouncer:
+    """Waits for a quiet period per key, then performs one write for every caller in the burst"""
+
+    def __init__(
+        self,
+        write: Callable[[Hashable, Any], Awaitable[Any]],
+        merge: Optional[Callable[[Any, Any], Any]] = None,
+        delay: float = WRITE_DEBOUNCE_DELAY
+    ):
+        self._write = write
+        # Default: the latest value replaces earlier ones
+        self._merge = merge or (lambda pending, value: value)
+        self.delay = delay
+        # key -> [value, futures, timer task] for writes still in their quiet period
+        self._pending: Dict[Hashable, list] = {}
+        # key -> flush task currently writing, so writes for a key never overlap
+        self._writing: Dict[Hashable, asyncio.Task] = {}
+
+    async def submit(self, key: Hashable, value: Any) -> Any:
+        """Queue a write and return the result of the write it was coalesced into"""
+        future = asyncio.get_running_loop().create_future()
+
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = [value, [], None]
+        else:
+            entry[0] = self._merge(entry[0], value)
+            entry[2].cancel()
+
+        entry[1].append(future)
+        entry[2] = asyncio.create_task(self._flush(key))
+        return await future
+
+    async def _flush(self, key: Hashable):
+        await asyncio.sleep(self.delay)
+
+        # From here on this flush owns the burst; later submits start a new one
+        value, futures, _ = self._pending.pop(key)
+        previous = self._writing.get(key)
+        current = self._writing[key] = asyncio.current_task()
+
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            result = await self._write(key, value)
+        except Exception as e:
+            self._resolve(futures, exception=e)
+        else:
+            self._resolve(futures, result=result)
+        finally:
+            if self._writing.get(key) is current:
+                del self._writing[key]
+
+    @staticmethod
+    def _resolve(futures: List[asyncio.Future], result: Any = None, exception: Optional[Exception] = None):
+        for future in futures:
+            # Callers that disconnected have already cancelled their future
+            if future.done():
+                continue
+            if exception is not None:
+                # A copy per caller, so one request's traceback doesn't
+                # accumulate frames from every other request it is raised in
+                future.set_exception(copy.copy(exception))
+            else:
+                future.set_result(result)
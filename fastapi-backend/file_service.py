@@ -4,18 +4,28 @@ Handles image uploads for slideshow and other media assets
 """
 import os
 import uuid
-import aiofiles
+import asyncio
 import logging
+import orjson
 from pathlib import Path
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageOps
 from io import BytesIO
 from fastapi import HTTPException, status, UploadFile
 
+try:
+    import pyvips
+    HAS_PYVIPS = True
+except (ImportError, OSError):
+    HAS_PYVIPS = False
+
 from database import db_manager
+from cache import TTLCache, get_shared, set_shared, invalidate_shared
+from debounce import WriteDebouncer
 from models import (
     FileUploadResponse, SlideshowImageCreate, SlideshowImageResponse,
+    SlideshowImageBatchItem,
     FileRecord
 )
 
@@ -24,9 +34,77 @@ logger = logging.getLogger(__name__)
 # File upload configuration
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB default
+UPLOAD_CHUNK_SIZE = 256 * 1024
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 THUMBNAIL_SIZE = (300, 300)
 LARGE_SIZE = (1200, 1200)
+SLIDESHOW_CACHE_TTL = int(os.getenv("SLIDESHOW_CACHE_TTL", "30"))  # seconds
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", str(os.cpu_count() or 1)))
+
+def _create_thumbnails_vips(original_path: Path, thumbnail_path: Path, large_path: Path) -> None:
+    """Create thumbnail and large versions with libvips' shrink-on-load pipeline"""
+    # Header-only open; pixels are not decoded here
+    original = pyvips.Image.new_from_file(str(original_path))
+    
+    # Create large version if original is bigger, then derive the thumbnail
+    # from it instead of decoding the original a second time
+    if original.width > LARGE_SIZE[0] or original.height > LARGE_SIZE[1]:
+        large_path.parent.mkdir(parents=True, exist_ok=True)
+        large = pyvips.Image.thumbnail(str(original_path), LARGE_SIZE[0], height=LARGE_SIZE[1], size="down").copy_memory()
+        large.jpegsave(str(large_path), Q=90, optimize_coding=True, strip=True)
+        thumbnail = large.thumbnail_image(THUMBNAIL_SIZE[0], height=THUMBNAIL_SIZE[1], size="down")
+    else:
+        thumbnail = pyvips.Image.thumbnail(str(original_path), THUMBNAIL_SIZE[0], height=THUMBNAIL_SIZE[1], size="down")
+    
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    thumbnail.jpegsave(str(thumbnail_path), Q=85, optimize_coding=True, strip=True)
+
+def _create_thumbnails_sync(original_path: Path, thumbnail_path: Path, large_path: Path) -> None:
+    """Create thumbnail and large versions of image (runs in a worker process)"""
+    if HAS_PYVIPS:
+        _create_thumbnails_vips(original_path, thumbnail_path, large_path)
+        return
+    
+    with Image.open(original_path) as img:
+        # Fix orientation based on EXIF data
+        img = ImageOps.exif_transpose(img)
+        
+        # Convert to RGB if necessary
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+        
+        # Create large version if original is bigger, resizing in place so
+        # the thumbnail below is resampled from the smaller image
+        if img.width > LARGE_SIZE[0] or img.height > LARGE_SIZE[1]:
+            large_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            img.thumbnail(LARGE_SIZE, Image.Resampling.LANCZOS)
+            img.save(large_path, "JPEG", quality=90, optimize=True)
+        
+        # Create thumbnail
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        img.save(thumbnail_path, "JPEG", quality=85, optimize=True)
+
+def _save_upload(src, dest: Path) -> int:
+    """Copy an upload to disk in chunks, stopping once it exceeds MAX_FILE_SIZE (runs in a thread)"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    size = 0
+    with open(dest, 'wb') as f:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                break
+            f.write(chunk)
+    return size
+
+def _unlink_if_exists(path: Path) -> None:
+    """Remove a file, ignoring variants that were never generated"""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
 
 class FileService:
     """Service for handling file uploads and media management"""
@@ -39,25 +117,43 @@ class FileService:
         (self.upload_dir / "images").mkdir(exist_ok=True)
         (self.upload_dir / "thumbnails").mkdir(exist_ok=True)
         (self.upload_dir / "large").mkdir(exist_ok=True)
+        
+        # Precompute path roots and URL prefixes for each size
+        self._path_roots = {
+            "original": self.upload_dir / "images",
+            "thumbnail": self.upload_dir / "thumbnails",
+            "large": self.upload_dir / "large",
+        }
+        base_url = os.getenv("BASE_URL", "http://localhost:8000")
+        self._url_prefixes = {
+            "original": f"{base_url}/files/images/",
+            "thumbnail": f"{base_url}/files/thumbnails/",
+            "large": f"{base_url}/files/large/",
+        }
+        
+        # Image processing is CPU-bound, keep it off the event loop. The pool is
+        # created on first use so importing this module doesn't spawn processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._thumbnail_tasks = set()
+        
+        # "slideshow:<tenant_id>" -> serialized slideshow, used when Redis isn't
+        # configured; dropped on every slideshow/file write
+        self._slideshow_body_cache = TTLCache(maxsize=1024, ttl=SLIDESHOW_CACHE_TTL)
+        
+        # Admin forms fire an update per edit; only the last one in a burst is written
+        self._slideshow_updates = WriteDebouncer(self._write_slideshow_image)
+    
+    async def _invalidate_slideshow(self, tenant_id: str):
+        """Drop a tenant's cached slideshow on every worker"""
+        await invalidate_shared(f"slideshow:{tenant_id}", self._slideshow_body_cache)
     
     def _get_file_path(self, tenant_id: str, filename: str, size: str = "original") -> Path:
         """Generate file path based on tenant and size"""
-        if size == "thumbnail":
-            return self.upload_dir / "thumbnails" / tenant_id / filename
-        elif size == "large":
-            return self.upload_dir / "large" / tenant_id / filename
-        else:
-            return self.upload_dir / "images" / tenant_id / filename
+        return self._path_roots.get(size, self._path_roots["original"]) / tenant_id / filename
     
     def _get_file_url(self, tenant_id: str, filename: str, size: str = "original") -> str:
         """Generate public URL for file"""
-        base_url = os.getenv("BASE_URL", "http://localhost:8000")
-        if size == "thumbnail":
-            return f"{base_url}/files/thumbnails/{tenant_id}/{filename}"
-        elif size == "large":
-            return f"{base_url}/files/large/{tenant_id}/{filename}"
-        else:
-            return f"{base_url}/files/images/{tenant_id}/{filename}"
+        return self._url_prefixes.get(size, self._url_prefixes["original"]) + tenant_id + "/" + filename
     
     def _validate_image(self, file: UploadFile) -> None:
         """Validate uploaded image file"""
@@ -78,43 +174,35 @@ class FileService:
     async def _create_thumbnails(self, original_path: Path, tenant_id: str, filename: str):
         """Create thumbnail and large versions of image"""
         try:
-            with Image.open(original_path) as img:
-                # Fix orientation based on EXIF data
-                img = ImageOps.exif_transpose(img)
-                
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Create thumbnail
-                thumbnail_path = self._get_file_path(tenant_id, filename, "thumbnail")
-                thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                img_thumbnail = img.copy()
-                img_thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-                img_thumbnail.save(thumbnail_path, "JPEG", quality=85, optimize=True)
-                
-                # Create large version if original is bigger
-                if img.width > LARGE_SIZE[0] or img.height > LARGE_SIZE[1]:
-                    large_path = self._get_file_path(tenant_id, filename, "large")
-                    large_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    img_large = img.copy()
-                    img_large.thumbnail(LARGE_SIZE, Image.Resampling.LANCZOS)
-                    img_large.save(large_path, "JPEG", quality=90, optimize=True)
-                
-                logger.info(f"Created thumbnails for {filename}")
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+            await asyncio.get_running_loop().run_in_executor(
+                self._pool,
+                _create_thumbnails_sync,
+                original_path,
+                self._get_file_path(tenant_id, filename, "thumbnail"),
+                self._get_file_path(tenant_id, filename, "large")
+            )
+            logger.info(f"Created thumbnails for {filename}")
                 
         except Exception as e:
             logger.error(f"Failed to create thumbnails for {filename}: {e}")
             # Don't raise exception - thumbnails are optional
     
+    def close(self):
+        """Shut down the thumbnail worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
     async def upload_image(
         self, 
         file: UploadFile, 
         tenant_id: str
     ) -> FileUploadResponse:
         """Upload and process image file"""
+        file_path = None
+        stored = False
         try:
             # Validate file
             self._validate_image(file)
@@ -127,40 +215,43 @@ class FileService:
             
             filename = f"{file_id}{file_extension}"
             
-            # Create tenant directory
+            # Stream original file to disk, enforcing the size limit as we go.
+            # The whole copy runs in one worker thread rather than two thread
+            # hops (read + write) per chunk
             file_path = self._get_file_path(tenant_id, filename)
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Read and validate file content
-            content = await file.read()
-            file_size = len(content)
+            file_size = await asyncio.to_thread(_save_upload, file.file, file_path)
             
             if file_size > MAX_FILE_SIZE:
+                file_path.unlink(missing_ok=True)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
                 )
             
-            # Save original file
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(content)
-            
-            # Create thumbnails asynchronously
-            await self._create_thumbnails(file_path, tenant_id, filename)
-            
             # Store file record in database
+            file_url = self._get_file_url(tenant_id, filename)
             async with db_manager.get_connection() as conn:
-                await conn.execute("""
+                # created_at comes from the column default so the response
+                # matches what was stored
+                file_row = await conn.fetchone("""
                     INSERT INTO files (
                         id, tenant_id, filename, original_filename, 
                         file_path, url, size, content_type
                     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING created_at
                 """,
                 file_id, tenant_id, filename, file.filename,
-                str(file_path), self._get_file_url(tenant_id, filename),
+                str(file_path), file_url,
                 file_size, file.content_type
                 )
                 await conn.commit()
+            stored = True
+            
+            # Create thumbnails in the background once the row exists; the
+            # response doesn't depend on them
+            task = asyncio.create_task(self._create_thumbnails(file_path, tenant_id, filename))
+            self._thumbnail_tasks.add(task)
+            task.add_done_callback(self._thumbnail_tasks.discard)
             
             logger.info(f"Uploaded image {filename} for tenant {tenant_id}")
             
@@ -168,16 +259,19 @@ class FileService:
                 id=file_id,
                 filename=filename,
                 original_filename=file.filename,
-                url=self._get_file_url(tenant_id, filename),
+                url=file_url,
                 size=file_size,
                 content_type=file.content_type,
-                created_at=datetime.utcnow()
+                created_at=file_row['created_at']
             )
             
         except HTTPException:
             raise
         except Exception as e:
             logger.error(f"Failed to upload image: {e}")
+            # No row points at the saved original, so don't leave it on disk
+            if file_path is not None and not stored:
+                file_path.unlink(missing_ok=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to upload image"
@@ -211,23 +305,20 @@ class FileService:
             thumbnail_path = self._get_file_path(tenant_id, file_record.filename, "thumbnail")
             large_path = self._get_file_path(tenant_id, file_record.filename, "large")
             
-            for file_path in [original_path, thumbnail_path, large_path]:
-                if file_path.exists():
-                    file_path.unlink()
+            await asyncio.gather(*[
+                asyncio.to_thread(_unlink_if_exists, file_path)
+                for file_path in [original_path, thumbnail_path, large_path]
+            ])
             
             # Delete from database
             async with db_manager.get_connection() as conn:
+                # Slideshow entries go with it via ON DELETE CASCADE
                 await conn.execute("""
                     DELETE FROM files WHERE id = ? AND tenant_id = ?
                 """, file_id, tenant_id)
                 
-                # Also delete slideshow entries
-                await conn.execute("""
-                    DELETE FROM slideshow_images 
-                    WHERE file_id = ? AND tenant_id = ?
-                """, file_id, tenant_id)
-                
                 await conn.commit()
+                await self._invalidate_slideshow(tenant_id)
             
             logger.info(f"Deleted file {file_id} for tenant {tenant_id}")
             return True
@@ -244,28 +335,34 @@ class FileService:
     ) -> SlideshowImageResponse:
         """Add image to slideshow"""
         try:
-            # Verify file exists
-            file_record = await self.get_file_info(file_id, tenant_id)
-            if not file_record:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="File not found"
-                )
-            
-            # Add to slideshow
             slideshow_id = str(uuid.uuid4())
             async with db_manager.get_connection() as conn:
-                await conn.execute("""
+                # Verify ownership and insert in one statement; no row back
+                # means the file doesn't exist for this tenant
+                file_row = await conn.fetchone("""
                     INSERT INTO slideshow_images (
                         id, tenant_id, file_id, title, caption, 
                         display_order, is_active
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    )
+                    SELECT ?, tenant_id, id, ?, ?, ?, ?
+                    FROM files 
+                    WHERE id = ? AND tenant_id = ?
+                    RETURNING created_at,
+                        (SELECT url FROM files WHERE files.id = slideshow_images.file_id) AS url
                 """,
-                slideshow_id, tenant_id, file_id, slideshow_data.title,
-                slideshow_data.caption, slideshow_data.display_order,
-                slideshow_data.is_active
+                slideshow_id, slideshow_data.title, slideshow_data.caption,
+                slideshow_data.display_order, slideshow_data.is_active,
+                file_id, tenant_id
                 )
+                
+                if not file_row:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="File not found"
+                    )
+                
                 await conn.commit()
+                await self._invalidate_slideshow(tenant_id)
             
             return SlideshowImageResponse(
                 id=slideshow_id,
@@ -275,8 +372,8 @@ class FileService:
                 caption=slideshow_data.caption,
                 display_order=slideshow_data.display_order,
                 is_active=slideshow_data.is_active,
-                url=file_record.url,
-                created_at=datetime.utcnow()
+                url=file_row['url'],
+                created_at=file_row['created_at']
             )
             
         except HTTPException:
@@ -288,20 +385,66 @@ class FileService:
                 detail="Failed to add image to slideshow"
             )
     
-    async def get_slideshow_images(self, tenant_id: str) -> List[SlideshowImageResponse]:
-        """Get all slideshow images for tenant"""
+    async def add_many_to_slideshow(
+        self, 
+        tenant_id: str, 
+        items: List[SlideshowImageBatchItem]
+    ) -> List[SlideshowImageResponse]:
+        """Add several images to slideshow in a single transaction"""
+        if not items:
+            return []
+        
         try:
+            rows = [
+                (
+                    str(uuid.uuid4()), item.title, item.caption,
+                    item.display_order, item.is_active, item.file_id, tenant_id
+                ) for item in items
+            ]
+            slideshow_ids = [row[0] for row in rows]
+            placeholders = ", ".join("?" * len(slideshow_ids))
+            
+            file_ids = list(dict.fromkeys(item.file_id for item in items))
+            file_placeholders = ", ".join("?" * len(file_ids))
+            
             async with db_manager.get_connection() as conn:
-                results = await conn.fetch("""
-                    SELECT si.*, f.url, f.filename
+                # Reject the whole batch if any file is unknown or belongs to
+                # another tenant, rather than silently skipping it
+                owned = await conn.fetch(f"""
+                    SELECT id FROM files
+                    WHERE tenant_id = ? AND id IN ({file_placeholders})
+                """, tenant_id, *file_ids)
+                owned_ids = {str(row['id']) for row in owned}
+                unknown_ids = [file_id for file_id in file_ids if file_id not in owned_ids]
+                if unknown_ids:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Files not found: {', '.join(unknown_ids)}"
+                    )
+                
+                await conn.executemany("""
+                    INSERT INTO slideshow_images (
+                        id, tenant_id, file_id, title, caption, 
+                        display_order, is_active
+                    )
+                    SELECT ?, tenant_id, id, ?, ?, ?, ?
+                    FROM files 
+                    WHERE id = ? AND tenant_id = ?
+                """, rows)
+                await conn.commit()
+                await self._invalidate_slideshow(tenant_id)
+                
+                results = await conn.fetch(f"""
+                    SELECT si.*, f.url
                     FROM slideshow_images si
                     JOIN files f ON si.file_id = f.id
-                    WHERE si.tenant_id = ? AND si.is_active = 1
+                    WHERE si.tenant_id = ? AND si.id IN ({placeholders})
                     ORDER BY si.display_order, si.created_at
-                """, tenant_id)
+                """, tenant_id, *slideshow_ids)
                 
+                # Rows come straight from our own table; skip re-validation
                 return [
-                    SlideshowImageResponse(
+                    SlideshowImageResponse.model_construct(
                         id=str(result['id']),
                         tenant_id=str(result['tenant_id']),
                         file_id=str(result['file_id']),
@@ -314,10 +457,64 @@ class FileService:
                     ) for result in results
                 ]
                 
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to add images to slideshow: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to add images to slideshow"
+            )
+    
+    async def _fetch_slideshow_images(self, tenant_id: str) -> List[SlideshowImageResponse]:
+        async with db_manager.get_connection() as conn:
+            results = await conn.fetch("""
+                SELECT si.*, f.url, f.filename
+                FROM slideshow_images si
+                JOIN files f ON si.file_id = f.id
+                WHERE si.tenant_id = ? AND si.is_active = 1
+                ORDER BY si.display_order, si.created_at
+            """, tenant_id)
+        
+        # Rows come straight from our own table; skip re-validation
+        return [
+            SlideshowImageResponse.model_construct(
+                id=str(result['id']),
+                tenant_id=str(result['tenant_id']),
+                file_id=str(result['file_id']),
+                title=result['title'],
+                caption=result['caption'],
+                display_order=result['display_order'],
+                is_active=bool(result['is_active']),
+                url=result['url'],
+                created_at=result['created_at']
+            ) for result in results
+        ]
+    
+    async def get_slideshow_images(self, tenant_id: str) -> List[SlideshowImageResponse]:
+        """Get all slideshow images for tenant"""
+        try:
+            return await self._fetch_slideshow_images(tenant_id)
         except Exception as e:
             logger.error(f"Failed to get slideshow images: {e}")
             return []
     
+    async def get_slideshow_body(self, tenant_id: str) -> bytes:
+        """Slideshow images for tenant, serialized once per cache lifetime"""
+        cache_key = f"slideshow:{tenant_id}"
+        body = await get_shared(cache_key, self._slideshow_body_cache)
+        if body is None:
+            try:
+                images = await self._fetch_slideshow_images(tenant_id)
+            except Exception as e:
+                # Serve an empty slideshow without caching it
+                logger.error(f"Failed to get slideshow images: {e}")
+                return b"[]"
+            
+            body = orjson.dumps([image.model_dump(mode="json") for image in images])
+            await set_shared(cache_key, body, self._slideshow_body_cache)
+        return body
+    
     async def update_slideshow_image(
         self, 
         slideshow_id: str, 
@@ -325,26 +522,32 @@ class FileService:
         update_data: SlideshowImageCreate
     ) -> Optional[SlideshowImageResponse]:
         """Update slideshow image"""
+        return await self._slideshow_updates.submit((tenant_id, slideshow_id), update_data)
+    
+    async def _write_slideshow_image(
+        self,
+        key: tuple,
+        update_data: SlideshowImageCreate
+    ) -> Optional[SlideshowImageResponse]:
+        """Write the latest update for a (tenant_id, slideshow_id) key"""
+        tenant_id, slideshow_id = key
         try:
             async with db_manager.get_connection() as conn:
-                await conn.execute("""
+                # Update and read back the row (with its file url) in one statement
+                result = await conn.fetchone("""
                     UPDATE slideshow_images 
                     SET title = ?, caption = ?, display_order = ?, 
                         is_active = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE id = ? AND tenant_id = ?
+                    RETURNING id, tenant_id, file_id, title, caption, 
+                        display_order, is_active, created_at,
+                        (SELECT url FROM files WHERE files.id = slideshow_images.file_id) AS url
                 """,
                 update_data.title, update_data.caption, update_data.display_order,
                 update_data.is_active, slideshow_id, tenant_id
                 )
                 await conn.commit()
-                
-                # Get updated record
-                result = await conn.fetchone("""
-                    SELECT si.*, f.url
-                    FROM slideshow_images si
-                    JOIN files f ON si.file_id = f.id
-                    WHERE si.id = ? AND si.tenant_id = ?
-                """, slideshow_id, tenant_id)
+                await self._invalidate_slideshow(tenant_id)
                 
                 if result:
                     return SlideshowImageResponse(
@@ -374,6 +577,7 @@ class FileService:
                     WHERE id = ? AND tenant_id = ?
                 """, slideshow_id, tenant_id)
                 await conn.commit()
+                await self._invalidate_slideshow(tenant_id)
                 
                 # Check if any rows were affected
                 return result.rowcount > 0 if hasattr(result, 'rowcount') else True
@@ -2,13 +2,19 @@
 Multi-tenant Baby Raffle SaaS Application
 FastAPI backend with OAuth2 authentication and tenant isolation
 """
-from fastapi import FastAPI, HTTPException, status, Depends, Request, Response, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, status, Depends, Request, Response, File, UploadFile, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse, FileResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse, FileResponse
 from fastapi.security import HTTPBearer
 from fastapi.staticfiles import StaticFiles
+import hashlib
 import logging
+import logging.handlers
 import os
+import queue
+import uuid
+import orjson
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -35,11 +41,16 @@ from models import (
     PaymentIntentCreate, PaymentIntentResponse, SubscriptionCreate, 
     SubscriptionResponse, BillingPortalRequest, BillingPortalResponse,
     FileUploadResponse, SlideshowImageCreate, SlideshowImageResponse,
+    SlideshowImageBatchItem,
     SiteConfigUpdate, SiteConfigResponse, DeploymentRequest, DeploymentResponse
 )
 from payment_service import payment_service
 from file_service import file_service
 from site_config_service import site_config_service
+from stats_refresher import stats_refresher
+from bet_ingestor import bet_ingestor, CategoryChangedError
+from pagination import encode_bets_cursor, decode_bets_cursor
+from cache import TTLCache, get_redis, close_redis, get_shared, set_shared, invalidate_shared
 from package_service import package_service
 from site_builder_service import site_builder_service
 from site_builder_models import (
@@ -48,7 +59,7 @@ from site_builder_models import (
     PreviewRequest, ThemeConfig
 )
 from middleware import (
-    tenant_context_middleware, auth_middleware, rate_limit_middleware,
+    tenant_context_middleware, auth_middleware, rate_limit_middleware, login_tracker,
     require_user, require_tenant, require_role
 )
 
@@ -56,13 +67,78 @@ from middleware import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Worker processes; more than one needs REDIS_URL to share rate limits and caches
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources once per worker and release them on shutdown"""
+    # Log records are handed to a background thread instead of being written
+    # from the event loop. QueueHandler.prepare formats each message when it
+    # is logged, so the listener thread never touches live argument objects
+    root_logger = logging.getLogger()
+    handlers = root_logger.handlers
+    log_listener = logging.handlers.QueueListener(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_listener.queue)]
+    log_listener.start()
+    
+    try:
+        logger.info("Starting Baby Raffle SaaS API...")
+        
+        # Without Redis, rate limit windows and response caches live in each
+        # worker, so limits multiply by the worker count and caches go stale
+        if WEB_CONCURRENCY > 1 and get_redis() is None:
+            logger.warning(
+                f"WEB_CONCURRENCY={WEB_CONCURRENCY} without REDIS_URL: rate limits apply "
+                f"per worker ({WEB_CONCURRENCY}x the configured limit) and cache "
+                f"invalidation only reaches the worker that handled the write"
+            )
+        
+        # Initialize database manager (creates the connection pool on PostgreSQL)
+        await db_manager.initialize()
+        await stats_refresher.start()
+        await bet_ingestor.start()
+        await login_tracker.start()
+        
+        logger.info("Baby Raffle SaaS API started successfully")
+        
+        yield
+        
+        logger.info("Shutting down Baby Raffle SaaS API...")
+        
+        # Cleanup database connections
+        await login_tracker.stop()
+        await bet_ingestor.stop()
+        await stats_refresher.stop()
+        await db_manager.close()
+        
+        # Stop thumbnail workers
+        file_service.close()
+        
+        # Close shared OAuth provider client
+        if oauth_service:
+            await oauth_service.close()
+        
+        # Close shared cache client
+        await close_redis()
+        
+        logger.info("Baby Raffle SaaS API shutdown complete")
+    
+    finally:
+        # Flush queued log records, including any for a failed startup or
+        # shutdown step, and log directly again
+        log_listener.stop()
+        root_logger.handlers = handlers
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Baby Raffle SaaS",
     description="Multi-tenant baby betting platform with OAuth2 authentication",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Security
@@ -72,53 +148,82 @@ security = HTTPBearer()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
-        "https://*.base2ml.com",
-        "https://mybabyraffle.base2ml.com",
         "http://localhost:3000",  # Development frontend
         "http://127.0.0.1:3000"
     ],
+    # base2ml.com and any tenant subdomain (Starlette doesn't expand "*" in allow_origins)
+    allow_origin_regex=r"^https://([a-z0-9-]+\.)?base2ml\.com$",
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Custom middleware
-@app.middleware("http")
-async def tenant_middleware(request: Request, call_next):
-    return await tenant_context_middleware(app)(request, call_next)
-
-@app.middleware("http") 
-async def auth_middleware_handler(request: Request, call_next):
-    # Process authentication and add user to request state
-    try:
-        user = await auth_middleware.process_authentication(request)
-        request.state.user = user
-    except HTTPException:
-        request.state.user = None
-    
-    response = await call_next(request)
-    return response
+# Tenant resolution, rate limiting and authentication share one middleware layer
+# so each request passes through a single call_next wrapper
+tenant_context = tenant_context_middleware(app)
 
 @app.middleware("http")
-async def rate_limit_middleware_handler(request: Request, call_next):
-    await rate_limit_middleware.check_rate_limit(request)
-    response = await call_next(request)
-    return response
-
-# Mount static files for uploads
+async def request_context_middleware(request: Request, call_next):
+    # The IP counter doesn't depend on the tenant, so it is updated while the
+    # tenant is resolved; the limit it is compared against (the tenant's plan)
+    # is applied once the tenant is known
+    ip_count = rate_limit_middleware.count_ip_early(request)
+    
+    async def authenticated_call_next(request: Request):
+        await rate_limit_middleware.check_rate_limit(request, ip_count)
+        
+        # Process authentication and add user to request state
+        try:
+            request.state.user = await auth_middleware.process_authentication(request)
+        except HTTPException:
+            request.state.user = None
+        
+        return await call_next(request)
+    
+    try:
+        return await tenant_context(request, authenticated_call_next)
+    finally:
+        # Requests rejected during tenant resolution never reach
+        # check_rate_limit; finish their count so the task isn't left
+        # dangling and they still count against the IP
+        if ip_count is not None and not ip_count.done():
+            await ip_count
+
+# Mount static files for uploads (nginx serves /files/ directly in production;
+# this mount covers local development)
 upload_dir = os.getenv("UPLOAD_DIR", "./uploads")
 if os.path.exists(upload_dir):
     app.mount("/files", StaticFiles(directory=upload_dir), name="files")
 
+# Load balancer probes hit /health constantly; the serialized body is reused
+# for a second so a burst of probes costs one build
+health_cache = TTLCache(maxsize=1, ttl=1)
+
 # Health check endpoint
 @app.get("/health", include_in_schema=False)
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    body = health_cache.get("health")
+    if body is None:
+        health = {"status": "healthy", "timestamp": datetime.utcnow()}
+        
+        # Pool utilisation for capacity monitoring (PostgreSQL only)
+        pool_stats = db_manager.pool_stats()
+        if pool_stats:
+            health["database_pool"] = pool_stats
+        
+        body = orjson.dumps(health)
+        health_cache.set("health", body)
+    
+    return Response(body, media_type="application/json")
+
+ROOT_BODY = orjson.dumps({"message": "Baby Raffle SaaS API", "version": "2.0.0"})
 
 # Root endpoint
 @app.get("/", include_in_schema=False)
 async def root():
-    return {"message": "Baby Raffle SaaS API", "version": "2.0.0"}
+    return Response(ROOT_BODY, media_type="application/json")
 
 # ============================================================================
 # OAUTH AUTHENTICATION ENDPOINTS
@@ -143,7 +248,7 @@ async def oauth_login(request: OAuthLoginRequest):
         return {"authorization_url": auth_url}
         
     except Exception as e:
-        logger.error(f"OAuth login failed: {e}")
+        logger.error("OAuth login failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate authorization URL"
@@ -157,27 +262,15 @@ async def oauth_callback(request: OAuthCallbackRequest):
         redirect_uri = "https://mybabyraffle.base2ml.com/auth/callback"
         
         # Complete OAuth flow
-        result = await oauth_service.handle_oauth_callback(
+        return await oauth_service.handle_oauth_callback(
             provider=request.provider,
             code=request.code,
             state=request.state,
             redirect_uri=redirect_uri
         )
         
-        return TokenResponse(
-            access_token=result["access_token"],
-            token_type=result["token_type"],
-            expires_in=result["expires_in"],
-            tenant_id=result["tenant"]["id"] if result["tenant"] else None,
-            user_info={
-                "user": result["user"],
-                "tenant": result["tenant"],
-                "is_new_user": result["is_new_user"]
-            }
-        )
-        
     except Exception as e:
-        logger.error(f"OAuth callback failed: {e}")
+        logger.error("OAuth callback failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="OAuth authentication failed"
@@ -226,7 +319,7 @@ async def create_tenant(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Tenant creation failed: {e}")
+        logger.error("Tenant creation failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create tenant"
@@ -240,22 +333,14 @@ async def validate_subdomain(subdomain: str):
         return {"available": is_available}
         
     except Exception as e:
-        logger.error(f"Subdomain validation failed: {e}")
+        logger.error("Subdomain validation failed: %s", e)
         return {"available": False}
 
 @app.get("/api/tenant/info", response_model=TenantResponse)
 async def get_tenant_info(tenant: TenantRecord = Depends(require_tenant)):
     """Get current tenant information"""
-    return TenantResponse(
-        id=tenant.id,
-        subdomain=tenant.subdomain,
-        name=tenant.name,
-        owner_email=tenant.owner_email,
-        status=tenant.status,
-        subscription_plan=tenant.subscription_plan,
-        created_at=tenant.created_at,
-        settings=tenant.settings
-    )
+    # response_model reads the fields straight off the record's attributes
+    return tenant
 
 @app.put("/api/tenant/settings", response_model=TenantResponse)
 async def update_tenant_settings(
@@ -269,25 +354,28 @@ async def update_tenant_settings(
         settings=settings
     )
     
-    return TenantResponse(
-        id=updated_tenant.id,
-        subdomain=updated_tenant.subdomain,
-        name=updated_tenant.name,
-        owner_email=updated_tenant.owner_email,
-        status=updated_tenant.status,
-        subscription_plan=updated_tenant.subscription_plan,
-        created_at=updated_tenant.created_at,
-        settings=updated_tenant.settings
-    )
+    return updated_tenant
+
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "15"))  # seconds
+
+# "stats:<tenant_id>" -> serialized /api/tenant/stats body, used when Redis
+# isn't configured; dropped on bet/category writes
+stats_cache = TTLCache(maxsize=1024, ttl=STATS_CACHE_TTL)
 
 @app.get("/api/tenant/stats", response_model=TenantStats)
 async def get_tenant_stats(
+    request: Request,
     tenant: TenantRecord = Depends(require_tenant),
     user: UserRecord = Depends(require_user)
 ):
     """Get tenant statistics and analytics"""
-    stats = await tenant_service.get_tenant_stats(tenant.id)
-    return TenantStats(**stats)
+    body = await get_shared(f"stats:{tenant.id}", stats_cache)
+    if body is None:
+        stats = await tenant_service.get_tenant_stats(tenant.id)
+        body = orjson.dumps(TenantStats(**stats).model_dump(mode="json"))
+        await set_shared(f"stats:{tenant.id}", body, stats_cache)
+    
+    return etag_response(request, body)
 
 @app.get("/api/tenant/users", response_model=List[UserResponse])
 async def get_tenant_users(
@@ -297,7 +385,7 @@ async def get_tenant_users(
     """Get all users in tenant (admin+ required)"""
     users = await tenant_service.get_tenant_users(tenant.id)
     return [
-        UserResponse(
+        UserResponse.model_construct(
             id=u.id,
             tenant_id=u.tenant_id,
             email=u.email,
@@ -314,47 +402,107 @@ async def get_tenant_users(
 # RAFFLE CATEGORY ENDPOINTS
 # ============================================================================
 
+CATEGORIES_CACHE_TTL = int(os.getenv("CATEGORIES_CACHE_TTL", "15"))  # seconds
+
+# tenant_id -> serialized /api/categories body, used when Redis isn't configured
+categories_cache = TTLCache(maxsize=1024, ttl=CATEGORIES_CACHE_TTL)
+
+# These bodies are edited by admins, so browsers must revalidate on every GET;
+# an unchanged body costs only a 304
+ETAG_CACHE_CONTROL = os.getenv("ETAG_CACHE_CONTROL", "private, no-cache")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header (a list of tags or "*") against etag"""
+    if not if_none_match:
+        return False
+    opaque_tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque_tag:
+            return True
+    return False
+
+def etag_response(request: Request, body: bytes) -> Response:
+    """JSON response with a weak ETag, or 304 when the client already has this body"""
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+async def get_cached_categories(tenant_id: str) -> Optional[bytes]:
+    """Serialized categories from Redis, or the local cache without Redis"""
+    redis = get_redis()
+    if redis is None:
+        return categories_cache.get(tenant_id)
+    
+    try:
+        return await redis.get(f"categories:{tenant_id}")
+    except Exception as e:
+        logger.warning("Categories cache read failed: %s", e)
+        return None
+
+async def cache_categories(tenant_id: str, body: bytes) -> None:
+    """Store serialized categories for a tenant"""
+    redis = get_redis()
+    if redis is None:
+        categories_cache.set(tenant_id, body)
+        return
+    
+    try:
+        await redis.set(f"categories:{tenant_id}", body, ex=CATEGORIES_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Categories cache write failed: %s", e)
+
+async def invalidate_categories(tenant_id: str) -> None:
+    """Drop cached categories after they change"""
+    categories_cache.pop(tenant_id)
+    redis = get_redis()
+    if redis is not None:
+        try:
+            await redis.delete(f"categories:{tenant_id}")
+        except Exception as e:
+            logger.warning("Categories cache invalidation failed: %s", e)
+
 @app.get("/api/categories", response_model=List[RaffleCategoryResponse])
-async def get_raffle_categories(tenant: TenantRecord = Depends(require_tenant)):
+async def get_raffle_categories(request: Request, tenant: TenantRecord = Depends(require_tenant)):
     """Get all active raffle categories for tenant"""
+    body = await get_cached_categories(tenant.id)
+    if body is not None:
+        return etag_response(request, body)
+    
     try:
         async with db_manager.get_tenant_connection(tenant.id) as conn:
+            # total_amount/bet_count are the validated totals from
+            # category_stats_rollup, kept current by a trigger on bets, so this is
+            # an idx_categories_tenant_active scan plus a primary key probe per row.
+            # Columns are named and cast to their JSON shapes so rows go
+            # straight to orjson with no per-field Python work
             categories = await conn.fetch("""
-                SELECT rc.*, 
-                       COALESCE(SUM(b.amount), 0) as total_amount,
-                       COUNT(b.id) as bet_count
+                SELECT rc.id, rc.tenant_id, rc.category_key, rc.category_name, rc.description,
+                       rc.bet_price::float8 as bet_price, rc.options, rc.is_active, rc.display_order,
+                       rc.created_at,
+                       COALESCE(s.validated_amount, 0)::float8 as total_amount,
+                       COALESCE(s.validated_count, 0) as bet_count
                 FROM raffle_categories rc
-                LEFT JOIN bets b ON rc.id = b.category_id AND b.is_validated = true
+                LEFT JOIN category_stats_rollup s ON s.category_id = rc.id
                 WHERE rc.tenant_id = $1 AND rc.is_active = true
-                GROUP BY rc.id, rc.tenant_id, rc.category_key, rc.category_name, 
-                         rc.description, rc.bet_price, rc.options, rc.is_active,
-                         rc.display_order, rc.created_at, rc.updated_at
                 ORDER BY rc.display_order
             """, tenant.id)
-            
-            return [
-                RaffleCategoryResponse(
-                    id=str(cat['id']),
-                    tenant_id=str(cat['tenant_id']),
-                    category_key=cat['category_key'],
-                    category_name=cat['category_name'],
-                    description=cat['description'],
-                    bet_price=float(cat['bet_price']),
-                    options=cat['options'],
-                    is_active=cat['is_active'],
-                    display_order=cat['display_order'],
-                    created_at=cat['created_at'],
-                    total_amount=float(cat['total_amount'] or 0),
-                    bet_count=cat['bet_count'] or 0
-                ) for cat in categories
-            ]
-            
+        
+        # asyncpg Records aren't dicts; orjson converts each one as it
+        # serializes it instead of building a second list of copies first
+        body = orjson.dumps(categories, default=dict)
+        
     except Exception as e:
-        logger.error(f"Failed to get categories: {e}")
+        logger.error("Failed to get categories: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get raffle categories"
         )
+    
+    await cache_categories(tenant.id, body)
+    return etag_response(request, body)
 
 @app.post("/api/categories", response_model=RaffleCategoryResponse)
 async def create_raffle_category(
@@ -382,24 +530,28 @@ async def create_raffle_category(
             category.is_active,
             category.display_order
             )
-            
-            return RaffleCategoryResponse(
-                id=str(new_category['id']),
-                tenant_id=str(new_category['tenant_id']),
-                category_key=new_category['category_key'],
-                category_name=new_category['category_name'],
-                description=new_category['description'],
-                bet_price=float(new_category['bet_price']),
-                options=new_category['options'],
-                is_active=new_category['is_active'],
-                display_order=new_category['display_order'],
-                created_at=new_category['created_at'],
-                total_amount=0,
-                bet_count=0
-            )
-            
+        
+        # Invalidate once the insert has committed
+        await invalidate_categories(tenant.id)
+        await invalidate_shared(f"stats:{tenant.id}", stats_cache)
+        
+        return RaffleCategoryResponse.model_construct(
+            id=str(new_category['id']),
+            tenant_id=str(new_category['tenant_id']),
+            category_key=new_category['category_key'],
+            category_name=new_category['category_name'],
+            description=new_category['description'],
+            bet_price=float(new_category['bet_price']),
+            options=new_category['options'],
+            is_active=new_category['is_active'],
+            display_order=new_category['display_order'],
+            created_at=new_category['created_at'],
+            total_amount=0,
+            bet_count=0
+        )
+        
     except Exception as e:
-        logger.error(f"Failed to create category: {e}")
+        logger.error("Failed to create category: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create raffle category"
@@ -409,6 +561,14 @@ async def create_raffle_category(
 # BETTING ENDPOINTS
 # ============================================================================
 
+CATEGORY_PRICE_CACHE_TTL = int(os.getenv("CATEGORY_PRICE_CACHE_TTL", "30"))  # seconds
+
+# (tenant_id, category_id) -> bet_price of an active category; unknown or
+# inactive ids are never cached, so new categories are picked up immediately.
+# Only used to reject bad submissions early: the ingestor's INSERT re-checks
+# price and is_active, since other workers' caches aren't invalidated
+category_price_cache = TTLCache(maxsize=10000, ttl=CATEGORY_PRICE_CACHE_TTL)
+
 @app.post("/api/bets/submit", response_model=Dict[str, Any])
 async def submit_bets(
     submission: BetSubmission,
@@ -416,116 +576,149 @@ async def submit_bets(
 ):
     """Submit multiple bets for a user"""
     try:
-        async with db_manager.get_tenant_connection(tenant.id) as conn:
-            async with conn.transaction():
-                bet_ids = []
-                total_amount = 0
-                
-                for bet in submission.bets:
-                    # Verify category exists and is active
-                    category = await conn.fetchrow("""
-                        SELECT id, bet_price, is_active 
-                        FROM raffle_categories 
-                        WHERE id = $1 AND tenant_id = $2 AND is_active = true
-                    """, bet.category_id, tenant.id)
-                    
-                    if not category:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"Invalid or inactive category: {bet.category_id}"
-                        )
-                    
-                    # Validate bet amount matches category price
-                    if bet.amount != category['bet_price']:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"Bet amount must be {category['bet_price']}"
-                        )
-                    
-                    # Create bet record
-                    new_bet = await conn.fetchrow("""
-                        INSERT INTO bets (
-                            tenant_id, category_id, user_name, user_email,
-                            bet_value, amount
-                        )
-                        VALUES ($1, $2, $3, $4, $5, $6)
-                        RETURNING id, created_at
-                    """, 
-                    tenant.id,
-                    bet.category_id,
-                    submission.user_name,
-                    submission.user_email,
-                    bet.bet_value,
-                    bet.amount
-                    )
-                    
-                    bet_ids.append(str(new_bet['id']))
-                    total_amount += bet.amount
-                
-                return {
-                    "success": True,
-                    "bet_ids": bet_ids,
-                    "total_amount": total_amount,
-                    "message": f"Successfully submitted {len(bet_ids)} bets"
-                }
-                
+        # Warm categories are priced from the cache; only misses hit the database
+        price_by_id = {}
+        missing_ids = []
+        for category_id in {bet.category_id for bet in submission.bets}:
+            price = category_price_cache.get((tenant.id, category_id))
+            if price is None:
+                missing_ids.append(category_id)
+            else:
+                price_by_id[category_id] = price
+        
+        if missing_ids:
+            async with db_manager.get_tenant_connection(tenant.id) as conn:
+                # Load every missing category in one query
+                categories = await conn.fetch("""
+                    SELECT id, bet_price 
+                    FROM raffle_categories 
+                    WHERE tenant_id = $1 AND is_active = true AND id = ANY($2::uuid[])
+                """, tenant.id, missing_ids)
+            
+            for cat in categories:
+                category_id = str(cat['id'])
+                price_by_id[category_id] = cat['bet_price']
+                category_price_cache.set((tenant.id, category_id), cat['bet_price'])
+        
+        # Validate, build the insert rows and total the amounts in a single pass;
+        # the total is kept in integer cents so it is exact
+        rows = []
+        total_cents = 0
+        for bet in submission.bets:
+            # Verify category exists and is active
+            price = price_by_id.get(bet.category_id)
+            if price is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid or inactive category: {bet.category_id}"
+                )
+            
+            # Validate bet amount matches category price
+            if bet.amount != price:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Bet amount must be {price}"
+                )
+            
+            rows.append((bet.category_id, submission.user_name, submission.user_email, bet.bet_value, bet.amount))
+            total_cents += round(bet.amount * 100)
+        
+        # Concurrent submissions are coalesced into batched inserts; the
+        # connection above is released so none is held while buffering
+        bet_ids = await bet_ingestor.submit(tenant.id, rows)
+        await invalidate_shared(f"stats:{tenant.id}", stats_cache)
+        
+        return {
+            "success": True,
+            "bet_ids": bet_ids,
+            "total_amount": total_cents / 100,
+            "message": f"Successfully submitted {len(bet_ids)} bets"
+        }
+        
     except HTTPException:
         raise
+    except CategoryChangedError:
+        # This worker's cached prices are stale; reload them on the next submit
+        for category_id in {bet.category_id for bet in submission.bets}:
+            category_price_cache.pop((tenant.id, category_id))
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A category was changed or deactivated; reload and try again"
+        )
     except Exception as e:
-        logger.error(f"Failed to submit bets: {e}")
+        logger.error("Failed to submit bets: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to submit bets"
         )
 
+BETS_MAX_LIMIT = 1000  # largest page a single /api/bets request may ask for
+
+# Only the response columns, named and cast to their BetResponse shapes and
+# served from the covering idx_bets_created_id index; validator name is a
+# per-row index probe. Pages continue from a (created_at, id) keyset so later
+# pages are an index range scan, not an OFFSET.
+_BETS_PAGE_SQL = """
+    SELECT b.id, b.tenant_id, b.category_id, b.user_name, b.user_email,
+           b.bet_value, b.amount::float8 as amount, b.is_validated,
+           (SELECT u.full_name FROM users u WHERE u.id = b.validated_by) as validated_by,
+           b.validated_at, b.created_at
+    FROM bets b
+    WHERE b.tenant_id = $1 AND ($3 = false OR b.is_validated = true) {keyset}
+    ORDER BY b.created_at DESC, b.id DESC
+    LIMIT $2
+"""
+BETS_FIRST_PAGE_SQL = _BETS_PAGE_SQL.format(keyset="")
+BETS_NEXT_PAGE_SQL = _BETS_PAGE_SQL.format(keyset="AND (b.created_at, b.id) < ($4, $5::uuid)")
+
 @app.get("/api/bets", response_model=List[BetResponse])
 async def get_bets(
     tenant: TenantRecord = Depends(require_tenant),
     user: UserRecord = Depends(require_role("admin")),
     validated_only: bool = False,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=BETS_MAX_LIMIT),
+    cursor: Optional[str] = None
 ):
-    """Get bets for tenant (admin+ required)"""
+    """Get bets for tenant, newest first (admin+ required)
+
+    When more bets may follow, the X-Next-Cursor response header carries the
+    cursor to pass back for the next page.
+    """
+    # Static SQL per page type lets asyncpg's statement cache reuse one prepared statement
+    if cursor:
+        try:
+            query_args = (tenant.id, limit, validated_only, *decode_bets_cursor(cursor))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = BETS_NEXT_PAGE_SQL
+    else:
+        query = BETS_FIRST_PAGE_SQL
+        query_args = (tenant.id, limit, validated_only)
+    
+    # Not cached: the admin validation view must see validations made through
+    # any worker immediately, and the page is a covering index range scan
     try:
         async with db_manager.get_tenant_connection(tenant.id) as conn:
-            where_clause = "WHERE b.tenant_id = $1"
-            params = [tenant.id]
-            
-            if validated_only:
-                where_clause += " AND b.is_validated = true"
-            
-            bets = await conn.fetch(f"""
-                SELECT b.*, rc.category_name, u.full_name as validated_by_name
-                FROM bets b
-                JOIN raffle_categories rc ON b.category_id = rc.id
-                LEFT JOIN users u ON b.validated_by = u.id
-                {where_clause}
-                ORDER BY b.created_at DESC
-                LIMIT $2
-            """, *params, limit)
-            
-            return [
-                BetResponse(
-                    id=str(bet['id']),
-                    tenant_id=str(bet['tenant_id']),
-                    category_id=str(bet['category_id']),
-                    user_name=bet['user_name'],
-                    user_email=bet['user_email'],
-                    bet_value=bet['bet_value'],
-                    amount=float(bet['amount']),
-                    is_validated=bet['is_validated'],
-                    validated_by=bet.get('validated_by_name'),
-                    validated_at=bet['validated_at'],
-                    created_at=bet['created_at']
-                ) for bet in bets
-            ]
-            
+            bets = await conn.fetch(query, *query_args)
     except Exception as e:
-        logger.error(f"Failed to get bets: {e}")
+        logger.error("Failed to get bets: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get bets"
         )
+    
+    # Rows already have the BetResponse shape. A short page is the last one
+    body = orjson.dumps(bets, default=dict)
+    next_cursor = encode_bets_cursor(bets[-1]) if len(bets) == limit else None
+    
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
 
 @app.post("/api/bets/validate", response_model=Dict[str, Any])
 async def validate_bets(
@@ -536,25 +729,42 @@ async def validate_bets(
     """Validate bets (admin+ required)"""
     try:
         async with db_manager.get_tenant_connection(tenant.id) as conn:
-            result = await conn.execute("""
+            # Return the validated rows so clients don't re-fetch them.
+            # Already-validated bets are skipped so re-submitting a batch
+            # doesn't rewrite rows, re-fire the totals triggers or change
+            # who validated them
+            validated = await conn.fetch("""
                 UPDATE bets 
                 SET is_validated = true,
                     validated_by = $1,
                     validated_at = CURRENT_TIMESTAMP
-                WHERE tenant_id = $2 AND id = ANY($3)
+                WHERE tenant_id = $2 AND id = ANY($3::uuid[]) AND is_validated = false
+                RETURNING id, category_id, amount, validated_at
             """, user.id, tenant.id, request.bet_ids)
-            
-            # Extract number of updated rows
-            updated_count = int(result.split()[-1]) if result else 0
-            
-            return {
-                "success": True,
-                "validated_count": updated_count,
-                "validated_by": user.full_name
-            }
-            
+        
+        # Category totals changed with the validation
+        if validated:
+            await invalidate_categories(tenant.id)
+            await invalidate_shared(f"stats:{tenant.id}", stats_cache)
+        
+        return {
+            "success": True,
+            "validated_count": len(validated),
+            "validated_by": user.full_name,
+            # The validator is the current user, so no users lookup is needed
+            "bets": [
+                {
+                    "id": str(bet['id']),
+                    "category_id": str(bet['category_id']),
+                    "amount": float(bet['amount']),
+                    "validated_by": user.full_name,
+                    "validated_at": bet['validated_at']
+                } for bet in validated
+            ]
+        }
+        
     except Exception as e:
-        logger.error(f"Failed to validate bets: {e}")
+        logger.error("Failed to validate bets: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to validate bets"
@@ -592,7 +802,7 @@ async def get_current_subscription(
     if not subscription:
         return None
     
-    return SubscriptionResponse(
+    return SubscriptionResponse.model_construct(
         id=subscription.id,
         tenant_id=subscription.tenant_id,
         stripe_subscription_id=subscription.stripe_subscription_id,
@@ -617,10 +827,19 @@ async def create_billing_portal_session(
     )
     return BillingPortalResponse(url=portal_url)
 
+# Pricing is static per process, so it's serialized once
+pricing_config_body: Optional[bytes] = None
+
 @app.get("/api/payments/pricing")
-async def get_pricing_config():
+async def get_pricing_config(request: Request):
     """Get pricing configuration"""
-    return await payment_service.get_pricing_config()
+    global pricing_config_body
+    if pricing_config_body is None:
+        pricing_config_body = orjson.dumps(
+            await payment_service.get_pricing_config(),
+            option=orjson.OPT_NON_STR_KEYS
+        )
+    return etag_response(request, pricing_config_body)
 
 @app.post("/api/webhooks/stripe")
 async def stripe_webhook(request: Request):
@@ -658,8 +877,9 @@ async def get_files(
 ):
     """Get uploaded files for tenant"""
     files = await file_service.get_tenant_files(tenant.id, limit, offset)
+    # Records are already typed by the service; skip re-validation
     return [
-        FileUploadResponse(
+        FileUploadResponse.model_construct(
             id=f.id,
             filename=f.filename,
             original_filename=f.original_filename,
@@ -709,10 +929,19 @@ async def add_to_slideshow(
     )
     return await file_service.add_to_slideshow(file_id, tenant.id, slideshow_data)
 
+@app.post("/api/slideshow/batch", response_model=List[SlideshowImageResponse])
+async def add_many_to_slideshow(
+    items: List[SlideshowImageBatchItem],
+    tenant: TenantRecord = Depends(require_tenant),
+    user: UserRecord = Depends(require_role("admin"))
+):
+    """Add several images to slideshow in one request (admin+ required)"""
+    return await file_service.add_many_to_slideshow(tenant.id, items)
+
 @app.get("/api/slideshow", response_model=List[SlideshowImageResponse])
-async def get_slideshow_images(tenant: TenantRecord = Depends(require_tenant)):
+async def get_slideshow_images(request: Request, tenant: TenantRecord = Depends(require_tenant)):
     """Get slideshow images for tenant"""
-    return await file_service.get_slideshow_images(tenant.id)
+    return etag_response(request, await file_service.get_slideshow_body(tenant.id))
 
 @app.put("/api/slideshow/{slideshow_id}", response_model=SlideshowImageResponse)
 async def update_slideshow_image(
@@ -764,17 +993,27 @@ async def remove_from_slideshow(
 # SITE CONFIGURATION ENDPOINTS
 # ============================================================================
 
+SITE_CONFIG_CACHE_TTL = int(os.getenv("SITE_CONFIG_CACHE_TTL", "15"))  # seconds
+
+# tenant_id -> serialized /api/site-config body, dropped on update
+site_config_cache = TTLCache(maxsize=1024, ttl=SITE_CONFIG_CACHE_TTL)
+
 @app.get("/api/site-config", response_model=SiteConfigResponse)
-async def get_site_config(tenant: TenantRecord = Depends(require_tenant)):
+async def get_site_config(request: Request, tenant: TenantRecord = Depends(require_tenant)):
     """Get site configuration for tenant"""
-    config = await site_config_service.get_site_config(tenant.id)
-    return SiteConfigResponse(
-        id=config.id,
-        tenant_id=config.tenant_id,
-        config=config.config,
-        created_at=config.created_at,
-        updated_at=config.updated_at
-    )
+    body = site_config_cache.get(tenant.id)
+    if body is None:
+        config = await site_config_service.get_site_config(tenant.id)
+        body = orjson.dumps(SiteConfigResponse(
+            id=config.id,
+            tenant_id=config.tenant_id,
+            config=config.config,
+            created_at=config.created_at,
+            updated_at=config.updated_at
+        ).model_dump(mode="json"))
+        site_config_cache.set(tenant.id, body)
+    
+    return etag_response(request, body)
 
 @app.put("/api/site-config", response_model=SiteConfigResponse)
 async def update_site_config(
@@ -783,7 +1022,9 @@ async def update_site_config(
     user: UserRecord = Depends(require_role("admin"))
 ):
     """Update site configuration (admin+ required)"""
-    return await site_config_service.update_site_config(tenant.id, updates)
+    result = await site_config_service.update_site_config(tenant.id, updates)
+    site_config_cache.pop(tenant.id)
+    return result
 
 @app.get("/api/site-config/preview")
 async def get_site_preview_data(tenant: TenantRecord = Depends(require_tenant)):
@@ -859,10 +1100,17 @@ async def update_hosting_package(
 # SITE BUILDER ENDPOINTS
 # ============================================================================
 
+# Themes are static per process, so they're serialized once
+themes_body: Optional[bytes] = None
+
 @app.get("/api/builder/themes", response_model=List[ThemeConfig])
-async def get_available_themes():
+async def get_available_themes(request: Request):
     """Get all available themes for site builder"""
-    return await site_builder_service.get_available_themes()
+    global themes_body
+    if themes_body is None:
+        themes = await site_builder_service.get_available_themes()
+        themes_body = orjson.dumps([theme.model_dump(mode="json") for theme in themes])
+    return etag_response(request, themes_body)
 
 @app.post("/api/builder/create")
 async def create_anonymous_builder(builder_data: SiteBuilderCreate):
@@ -916,7 +1164,7 @@ async def list_all_tenants(
             offset=offset
         )
     except Exception as e:
-        logger.error(f"Failed to list tenants: {e}")
+        logger.error("Failed to list tenants: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to list tenants"
@@ -928,7 +1176,7 @@ async def list_all_tenants(
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": "Request failed",
@@ -937,10 +1185,21 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         }
     )
 
+TRACEBACK_LOG_INTERVAL = float(os.getenv("TRACEBACK_LOG_INTERVAL", "1"))  # seconds
+
+# Exception types whose traceback was logged within the last interval
+recent_tracebacks = TTLCache(maxsize=256, ttl=TRACEBACK_LOG_INTERVAL)
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    # A failing dependency can raise on every request; keep one traceback per
+    # exception type per interval and log the rest without the stack
+    exc_type = type(exc)
+    log_traceback = recent_tracebacks.get(exc_type) is None
+    if log_traceback:
+        recent_tracebacks.set(exc_type, True)
+    logger.error("Unhandled exception: %s", exc, exc_info=log_traceback)
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -952,32 +1211,14 @@ async def general_exception_handler(request: Request, exc: Exception):
 # STARTUP/SHUTDOWN EVENTS
 # ============================================================================
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database connections and resources"""
-    logger.info("Starting Baby Raffle SaaS API...")
-    
-    # Initialize database manager
-    await db_manager.initialize()
-    
-    logger.info("Baby Raffle SaaS API started successfully")
-
-@app.on_event("shutdown") 
-async def shutdown_event():
-    """Cleanup resources"""
-    logger.info("Shutting down Baby Raffle SaaS API...")
-    
-    # Cleanup database connections
-    await db_manager.close()
-    
-    logger.info("Baby Raffle SaaS API shutdown complete")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        workers=WEB_CONCURRENCY,
         log_level="info"
     )
\ No newline at end of file
@@ -2,14 +2,20 @@
 Multi-tenant middleware for request processing and security
 """
 from fastapi import Request, Response, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
+import os
 import time
+import asyncio
 import secrets
-from typing import Optional, Dict, Any, Callable
+import hashlib
+import itertools
+from typing import Optional, Dict, Any, Callable, Set, Tuple
 from urllib.parse import urlparse
+from collections import defaultdict
 import re
 
+from .cache import TTLCache, get_redis
 from .database import db_manager
 from .models import TenantRecord, UserRecord
 from .oauth import oauth_service
@@ -17,12 +23,51 @@ from .tenant_service import tenant_service
 
 logger = logging.getLogger(__name__)
 
+# Verified tokens skip signature verification for this long
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))  # seconds
+# Authenticated user rows are shared by all of a user's tokens for this long.
+# Nothing invalidates them early, so a role, status or OAuth link change
+# (e.g. the re-link in oauth.py) takes up to this long to reach requests;
+# lower it if deactivations must apply sooner
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))  # seconds
+
+# last_login is written in one batched UPDATE per interval rather than per authentication
+LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", "2"))  # seconds
+
+# Correlation ids for error responses: a random per-process prefix plus a
+# counter, so generating one needs no OS entropy
+REQUEST_ID_PREFIX = secrets.token_hex(4)
+_request_id_counter = itertools.count()
+
+def make_request_id() -> str:
+    """16 hex character id, unique across workers and requests"""
+    return f"{REQUEST_ID_PREFIX}{next(_request_id_counter) & 0xffffffff:08x}"
+
+# Paths served without tenant resolution
+TENANTLESS_PATHS = frozenset({'/health', '/docs', '/openapi.json', '/'})
+RATE_LIMIT_EXEMPT_PATHS = frozenset({'/health', '/'})
+
+# Added to every response; pre-encoded so they append straight onto the raw header list
+SECURITY_HEADERS = (
+    (b'x-content-type-options', b'nosniff'),
+    (b'x-frame-options', b'DENY'),
+    (b'x-xss-protection', b'1; mode=block'),
+    (b'strict-transport-security', b'max-age=31536000; includeSubDomains'),
+    (b'referrer-policy', b'strict-origin-when-cross-origin'),
+)
+
+# Host parsing runs on every request, so the patterns are compiled once
+SUBDOMAIN_RE = re.compile(r'^[a-z0-9]([a-z0-9-]*[a-z0-9])?$')
+IPV4_RE = re.compile(r'^\d+\.\d+\.\d+\.\d+$')
+
 class TenantContextMiddleware:
     """Middleware to resolve tenant context from subdomain and set database context"""
     
     def __init__(self, app):
         self.app = app
         self.base_domain = "base2ml.com"
+        self.base_domain_suffix = f".{self.base_domain}"
+        self.base_domain_suffix_len = len(self.base_domain_suffix)
         self.onboarding_subdomain = "mybabyraffle"
     
     async def __call__(self, request: Request, call_next: Callable):
@@ -49,20 +94,20 @@ class TenantContextMiddleware:
             
         except HTTPException as e:
             # Handle known HTTP exceptions
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=e.status_code,
                 content={
                     "error": "Request processing failed",
                     "message": e.detail,
-                    "request_id": secrets.token_hex(8)
+                    "request_id": make_request_id()
                 }
             )
         except Exception as e:
             # Handle unexpected errors
-            error_id = secrets.token_hex(8)
-            logger.error(f"Unexpected error in middleware [{error_id}]: {e}", exc_info=True)
+            error_id = make_request_id()
+            logger.error("Unexpected error in middleware [%s]: %s", error_id, e, exc_info=True)
             
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={
                     "error": "Internal server error",
@@ -74,24 +119,26 @@ class TenantContextMiddleware:
     async def resolve_tenant_context(self, request: Request) -> Dict[str, Any]:
         """Resolve tenant context from request"""
         host = request.headers.get('host', '').lower()
+        path = request.url.path
         
         # Parse subdomain from host
         subdomain = self.extract_subdomain(host)
         
+        # Every key is always set, so per-request readers index directly
         context = {
             'subdomain': subdomain,
             'tenant': None,
             'tenant_id': None,
             'is_onboarding': subdomain == self.onboarding_subdomain,
-            'is_api_request': request.url.path.startswith('/api/'),
+            'is_api_request': path.startswith('/api/'),
             'user_agent': request.headers.get('user-agent', ''),
             'ip_address': self.get_client_ip(request)
         }
         
         # Skip tenant resolution for onboarding site and health checks
         if (context['is_onboarding'] or 
-            request.url.path in ['/health', '/docs', '/openapi.json', '/'] or
-            request.url.path.startswith('/static/')):
+            path in TENANTLESS_PATHS or
+            path.startswith('/static/')):
             return context
         
         # Resolve tenant for subdomain
@@ -112,20 +159,7 @@ class TenantContextMiddleware:
             
             context['tenant'] = tenant
             context['tenant_id'] = tenant.id
-            
-            # Set database tenant context for RLS
-            try:
-                async with db_manager.get_connection() as conn:
-                    await conn.execute(
-                        "SELECT set_config('app.current_tenant_id', $1, true)",
-                        tenant.id
-                    )
-            except Exception as e:
-                logger.error(f"Failed to set tenant context: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to set tenant context"
-                )
+            # RLS tenant context is bound per query by db_manager.get_tenant_connection
         
         return context
     
@@ -135,25 +169,26 @@ class TenantContextMiddleware:
             return None
         
         # Remove port if present
-        host = host.split(':')[0]
+        host = host.partition(':')[0]
         
         # Check if it's a subdomain of base_domain
-        if not host.endswith(f'.{self.base_domain}'):
+        if not host.endswith(self.base_domain_suffix):
             # Handle localhost and IP addresses for development
-            if host in ['localhost', '127.0.0.1'] or re.match(r'^\d+\.\d+\.\d+\.\d+$', host):
+            if host in ['localhost', '127.0.0.1'] or IPV4_RE.match(host):
                 return None
             return None
         
         # Extract subdomain
-        subdomain = host[:-len(f'.{self.base_domain}')]
+        subdomain = host[:-self.base_domain_suffix_len]
         
         # Validate subdomain format
-        if not re.match(r'^[a-z0-9]([a-z0-9-]*[a-z0-9])?$', subdomain):
+        if not SUBDOMAIN_RE.match(subdomain):
             return None
         
         return subdomain
     
-    def get_client_ip(self, request: Request) -> str:
+    @staticmethod
+    def get_client_ip(request: Request) -> str:
         """Get client IP address accounting for proxies"""
         # Check for forwarded headers (behind load balancer/proxy)
         forwarded_for = request.headers.get('x-forwarded-for')
@@ -170,16 +205,10 @@ class TenantContextMiddleware:
     
     def add_security_headers(self, response: Response, tenant_context: Dict[str, Any]):
         """Add security headers to response"""
-        tenant = tenant_context.get('tenant')
+        tenant = tenant_context['tenant']
         
-        # Basic security headers
-        response.headers.update({
-            'X-Content-Type-Options': 'nosniff',
-            'X-Frame-Options': 'DENY',
-            'X-XSS-Protection': '1; mode=block',
-            'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
-            'Referrer-Policy': 'strict-origin-when-cross-origin',
-        })
+        # Basic security headers (no route sets these itself, so appending can't duplicate them)
+        response.raw_headers.extend(SECURITY_HEADERS)
         
         # Tenant-specific CSP if configured
         if tenant and tenant.settings:
@@ -194,24 +223,30 @@ class TenantContextMiddleware:
                          tenant_context: Dict[str, Any]):
         """Log request for monitoring and analytics"""
         
+        # Log level based on status code
+        if response.status_code >= 500:
+            level, message = logging.ERROR, "Request failed: %s"
+        elif response.status_code >= 400:
+            level, message = logging.WARNING, "Client error: %s"
+        else:
+            level, message = logging.INFO, "Request completed: %s"
+        
+        # Runs on every request; skip building the record when it would be dropped
+        if not logger.isEnabledFor(level):
+            return
+        
         log_data = {
             'method': request.method,
-            'path': str(request.url.path),
+            'path': request.url.path,
             'status_code': response.status_code,
             'process_time': round(process_time * 1000, 2),  # ms
-            'tenant_id': tenant_context.get('tenant_id'),
-            'subdomain': tenant_context.get('subdomain'),
-            'ip_address': tenant_context.get('ip_address'),
-            'user_agent': tenant_context.get('user_agent', '')[:200]  # Truncate
+            'tenant_id': tenant_context['tenant_id'],
+            'subdomain': tenant_context['subdomain'],
+            'ip_address': tenant_context['ip_address'],
+            'user_agent': tenant_context['user_agent'][:200]  # Truncate
         }
         
-        # Log level based on status code
-        if response.status_code >= 500:
-            logger.error(f"Request failed: {log_data}")
-        elif response.status_code >= 400:
-            logger.warning(f"Client error: {log_data}")
-        else:
-            logger.info(f"Request completed: {log_data}")
+        logger.log(level, message, log_data)
 
 class AuthenticationMiddleware:
     """Middleware for handling JWT authentication and user context"""
@@ -222,12 +257,18 @@ class AuthenticationMiddleware:
             '/api/auth/login', '/api/auth/callback', '/api/tenant/create',
             '/api/tenant/validate-subdomain'
         }
+        # blake2b(token) -> (user id, token tenant_id, token exp)
+        self._token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL)
+        # user id -> UserRecord
+        self._user_cache = TTLCache(maxsize=10000, ttl=USER_CACHE_TTL)
     
     async def process_authentication(self, request: Request) -> Optional[UserRecord]:
         """Process authentication and return user context"""
         
+        path = request.url.path
+        
         # Skip authentication for public paths
-        if request.url.path in self.public_paths:
+        if path in self.public_paths:
             return None
         
         # Skip for onboarding site (separate auth flow)
@@ -239,7 +280,7 @@ class AuthenticationMiddleware:
         auth_header = request.headers.get('authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
             # For API endpoints, require authentication
-            if request.url.path.startswith('/api/'):
+            if path.startswith('/api/'):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Authentication required",
@@ -248,22 +289,35 @@ class AuthenticationMiddleware:
             return None
         
         token = auth_header[7:]  # Remove 'Bearer ' prefix
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        request_tenant_id = tenant_context.get('tenant_id')
+        
+        cached = self._token_cache.get(cache_key)
+        if cached is not None and cached[2] <= time.time():
+            self._token_cache.pop(cache_key)
+            cached = None
         
         try:
-            # Verify JWT token
-            payload = oauth_service.verify_access_token(token)
+            if cached is not None:
+                # Token already verified; skip the signature check
+                user_id, tenant_id, _ = cached
+            else:
+                # Verify JWT token
+                payload = oauth_service.verify_access_token(token)
+                user_id = payload['sub']
+                tenant_id = payload.get('tenant_id')
+                self._token_cache.set(cache_key, (user_id, tenant_id, payload['exp']))
             
-            # Get user from database
-            user_id = payload['sub']
-            tenant_id = payload.get('tenant_id')
-            
-            async with db_manager.get_connection() as conn:
-                user_row = await conn.fetchrow("""
-                    SELECT u.*, t.subdomain, t.status as tenant_status
-                    FROM users u
-                    JOIN tenants t ON u.tenant_id = t.id  
-                    WHERE u.id = $1 AND u.status = 'active'
-                """, user_id)
+            user = self._user_cache.get(user_id)
+            if user is None:
+                # Get user from database
+                async with db_manager.get_connection() as conn:
+                    user_row = await conn.fetchrow("""
+                        SELECT u.*, t.subdomain, t.status as tenant_status
+                        FROM users u
+                        JOIN tenants t ON u.tenant_id = t.id  
+                        WHERE u.id = $1 AND u.status = 'active'
+                    """, user_id)
                 
                 if not user_row:
                     raise HTTPException(
@@ -271,31 +325,83 @@ class AuthenticationMiddleware:
                         detail="User not found or inactive"
                     )
                 
-                # Verify tenant matches request context
-                request_tenant_id = tenant_context.get('tenant_id')
-                if request_tenant_id and tenant_id != request_tenant_id:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Token not valid for this tenant"
-                    )
-                
-                # Update last login
-                await conn.execute("""
-                    UPDATE users SET last_login = CURRENT_TIMESTAMP 
-                    WHERE id = $1
-                """, user_id)
+                # Update last login (batched in the background)
+                login_tracker.record(user_id)
                 
-                return UserRecord(user_row)
+                user = UserRecord(user_row)
+                self._user_cache.set(user_id, user)
+            
+            # Verify tenant matches request context
+            if request_tenant_id and tenant_id != request_tenant_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Token not valid for this tenant"
+                )
+            
+            return user
                 
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Authentication error: {e}")
+            logger.error("Authentication error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication token"
             )
 
+class LoginTracker:
+    """Collects authenticated user ids and stamps their last_login in batches"""
+    
+    def __init__(self):
+        self._pending: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    def record(self, user_id: str):
+        """Mark a user as having just logged in"""
+        self._pending.add(user_id)
+    
+    async def start(self):
+        """Start the background flush task (PostgreSQL only, like the auth query that feeds it)"""
+        if not db_manager.is_postgres or self._task:
+            return
+        
+        self._task = asyncio.create_task(self._run())
+        logger.info("Login tracker started")
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LAST_LOGIN_FLUSH_INTERVAL)
+            await self.flush()
+    
+    async def flush(self):
+        """Write last_login for every user recorded since the previous flush"""
+        if not self._pending or not db_manager.is_postgres:
+            return
+        
+        user_ids, self._pending = self._pending, set()
+        try:
+            async with db_manager.get_connection() as conn:
+                await conn.execute("""
+                    UPDATE users SET last_login = CURRENT_TIMESTAMP 
+                    WHERE id = ANY($1::uuid[])
+                """, list(user_ids))
+        except asyncio.CancelledError:
+            # Keep the ids for the final flush in stop()
+            self._pending |= user_ids
+            raise
+        except Exception as e:
+            # Retried with the next flush
+            self._pending |= user_ids
+            logger.error("Failed to update last login for %s users: %s", len(user_ids), e)
+    
+    async def stop(self):
+        """Stop the flush task and write any remaining logins"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.wait([self._task])
+            self._task = None
+        await self.flush()
+
 class RateLimitMiddleware:
     """Rate limiting middleware per tenant and IP"""
     
@@ -305,15 +411,27 @@ class RateLimitMiddleware:
             'premium': {'requests_per_minute': 500, 'requests_per_hour': 5000},
             'enterprise': {'requests_per_minute': 2000, 'requests_per_hour': 20000}
         }
-        # In production, use Redis for distributed rate limiting
-        self.memory_store = {}  # Temporary in-memory store
+        # Per-process fallback when Redis isn't configured: [window number,
+        # counts by key] for the current minute and hour. A new window swaps in
+        # a fresh dict, so expired counts are dropped without scanning keys
+        self._minute_window = [-1, defaultdict(int)]
+        self._hour_window = [-1, defaultdict(int)]
     
-    async def check_rate_limit(self, request: Request):
-        """Check rate limits for tenant and IP"""
+    def count_ip_early(self, request: Request) -> Optional[asyncio.Task]:
+        """Start counting the request against its IP in Redis so the round trip overlaps tenant resolution"""
+        # The in-process fallback is synchronous, so there is nothing to overlap
+        if request.url.path in RATE_LIMIT_EXEMPT_PATHS or get_redis() is None:
+            return None
+        
+        ip_address = TenantContextMiddleware.get_client_ip(request)
+        return asyncio.create_task(self._count_request(f"ip:{ip_address}"))
+    
+    async def check_rate_limit(self, request: Request, ip_count: Optional[asyncio.Task] = None):
+        """Check rate limits for tenant and IP; ip_count is a count started by count_ip_early"""
         tenant_context = getattr(request.state, 'tenant_context', {})
         
         # Skip rate limiting for health checks
-        if request.url.path in ['/health', '/']:
+        if request.url.path in RATE_LIMIT_EXEMPT_PATHS:
             return
         
         tenant = tenant_context.get('tenant')
@@ -327,74 +445,89 @@ class RateLimitMiddleware:
             limits = {'requests_per_minute': 50, 'requests_per_hour': 200}  # Stricter for non-tenants
         
         # Check IP-based rate limiting
-        await self._check_ip_rate_limit(ip_address, limits)
+        await self._check_ip_rate_limit(ip_address, limits, ip_count)
         
         # Check tenant-based rate limiting if applicable
         if tenant:
             await self._check_tenant_rate_limit(tenant.id, limits)
     
-    async def _check_ip_rate_limit(self, ip_address: str, limits: Dict[str, int]):
-        """Check IP-based rate limits"""
+    async def _count_request(self, prefix: str) -> Tuple[int, int]:
+        """Count this request in the current minute and hour windows and return both totals"""
         current_time = int(time.time())
-        minute_key = f"ip:{ip_address}:{current_time // 60}"
-        hour_key = f"ip:{ip_address}:{current_time // 3600}"
+        minute_key = f"{prefix}:{current_time // 60}"
+        hour_key = f"{prefix}:{current_time // 3600}"
         
-        # Simple in-memory rate limiting (use Redis in production)
-        minute_count = self.memory_store.get(minute_key, 0)
-        hour_count = self.memory_store.get(hour_key, 0)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                # Fixed-window counters shared by every worker; the expiry
+                # (window plus slack) drops each key once its window is over
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.incr(minute_key)
+                    pipe.expire(minute_key, 65)
+                    pipe.incr(hour_key)
+                    pipe.expire(hour_key, 3605)
+                    minute_count, _, hour_count, _ = await pipe.execute()
+                return minute_count, hour_count
+            except Exception as e:
+                logger.warning("Rate limit counter update failed: %s", e)
         
-        if minute_count >= limits['requests_per_minute']:
+        return (
+            self._count_in_window(self._minute_window, current_time // 60, prefix),
+            self._count_in_window(self._hour_window, current_time // 3600, prefix)
+        )
+    
+    @staticmethod
+    def _count_in_window(window: list, number: int, key: str) -> int:
+        """Increment key's count in the given window, starting fresh when the window rolls over"""
+        if window[0] != number:
+            window[0], window[1] = number, defaultdict(int)
+        
+        counts = window[1]
+        counts[key] += 1
+        return counts[key]
+    
+    async def _check_ip_rate_limit(self, ip_address: str, limits: Dict[str, int], ip_count: Optional[asyncio.Task] = None):
+        """Check IP-based rate limits"""
+        if ip_count is not None:
+            minute_count, hour_count = await ip_count
+        else:
+            minute_count, hour_count = await self._count_request(f"ip:{ip_address}")
+        
+        if minute_count > limits['requests_per_minute']:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Rate limit exceeded (per minute)",
                 headers={"Retry-After": "60"}
             )
         
-        if hour_count >= limits['requests_per_hour']:
+        if hour_count > limits['requests_per_hour']:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Rate limit exceeded (per hour)",
                 headers={"Retry-After": "3600"}
             )
-        
-        # Increment counters
-        self.memory_store[minute_key] = minute_count + 1
-        self.memory_store[hour_key] = hour_count + 1
-        
-        # Clean up old entries (simple TTL simulation)
-        if len(self.memory_store) > 10000:  # Prevent memory bloat
-            old_keys = [k for k in self.memory_store.keys() 
-                       if int(k.split(':')[-1]) < current_time - 3600]
-            for key in old_keys:
-                self.memory_store.pop(key, None)
     
     async def _check_tenant_rate_limit(self, tenant_id: str, limits: Dict[str, int]):
         """Check tenant-based rate limits"""
-        current_time = int(time.time())
-        minute_key = f"tenant:{tenant_id}:{current_time // 60}"
-        hour_key = f"tenant:{tenant_id}:{current_time // 3600}"
-        
-        minute_count = self.memory_store.get(minute_key, 0)
-        hour_count = self.memory_store.get(hour_key, 0)
+        minute_count, hour_count = await self._count_request(f"tenant:{tenant_id}")
         
-        if minute_count >= limits['requests_per_minute'] * 2:  # Higher limit for tenant
+        if minute_count > limits['requests_per_minute'] * 2:  # Higher limit for tenant
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Tenant rate limit exceeded (per minute)"
             )
         
-        if hour_count >= limits['requests_per_hour'] * 2:
+        if hour_count > limits['requests_per_hour'] * 2:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Tenant rate limit exceeded (per hour)"
             )
-        
-        self.memory_store[minute_key] = minute_count + 1
-        self.memory_store[hour_key] = hour_count + 1
 
 # Middleware instances for use in FastAPI app
 tenant_context_middleware = TenantContextMiddleware
 auth_middleware = AuthenticationMiddleware()
+login_tracker = LoginTracker()
 rate_limit_middleware = RateLimitMiddleware()
 
 # Dependency functions for FastAPI
@@ -409,7 +542,8 @@ async def get_current_tenant(request: Request) -> Optional[TenantRecord]:
 
 async def require_tenant(request: Request) -> TenantRecord:
     """FastAPI dependency to require tenant context"""
-    tenant = await get_current_tenant(request)
+    # Resolved once per request by TenantContextMiddleware
+    tenant = getattr(request.state, 'tenant_context', {}).get('tenant')
     if not tenant:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -419,7 +553,8 @@ async def require_tenant(request: Request) -> TenantRecord:
 
 async def get_current_user(request: Request) -> Optional[UserRecord]:
     """FastAPI dependency to get current authenticated user"""
-    return await auth_middleware.process_authentication(request)
+    # Authenticated once per request by the request context middleware
+    return getattr(request.state, 'user', None)
 
 async def require_user(request: Request) -> UserRecord:
     """FastAPI dependency to require authenticated user"""
@@ -431,15 +566,16 @@ async def require_user(request: Request) -> UserRecord:
         )
     return user
 
-async def require_role(required_role: str):
+ROLE_HIERARCHY = {'owner': 3, 'admin': 2, 'user': 1}
+
+def require_role(required_role: str):
     """FastAPI dependency factory to require specific role"""
-    async def role_checker(user: UserRecord = require_user) -> UserRecord:
-        role_hierarchy = {'owner': 3, 'admin': 2, 'user': 1}
-        
-        user_level = role_hierarchy.get(user.role, 0)
-        required_level = role_hierarchy.get(required_role, 0)
+    required_level = ROLE_HIERARCHY.get(required_role, 0)
+    
+    async def role_checker(request: Request) -> UserRecord:
+        user = await require_user(request)
         
-        if user_level < required_level:
+        if ROLE_HIERARCHY.get(user.role, 0) < required_level:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Role '{required_role}' or higher required"
@@ -447,4 +583,4 @@ async def require_role(required_role: str):
         
         return user
     
-    return role_checker
\ No newline at end of file
+    return role_checker
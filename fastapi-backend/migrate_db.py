@@ -25,18 +25,11 @@ async def run_migrations():
         
         # Connect to database and execute schema
         async with aiosqlite.connect(db_path) as db:
-            # Split SQL commands and execute them
-            commands = [cmd.strip() for cmd in schema_sql.split(';') if cmd.strip()]
-            
-            for command in commands:
-                if command:
-                    try:
-                        await db.execute(command)
-                    except Exception as e:
-                        print(f"⚠️  Warning executing command: {e}")
-                        continue
-            
-            await db.commit()
+            # sqlite3 parses and runs the whole script in one call; wrapping it
+            # in a transaction applies it atomically with a single commit.
+            # Every statement is idempotent, so any error is a real failure
+            # and closing the connection rolls the script back
+            await db.executescript(f"BEGIN;\n{schema_sql}\nCOMMIT;")
         
         print("✅ Database migration completed successfully!")
         print(f"📍 Database location: {os.path.abspath(db_path)}")
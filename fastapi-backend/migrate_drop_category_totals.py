@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Migration script to drop the duplicate per-category totals from an existing
+PostgreSQL database. category_stats_rollup is the single source for them;
+fresh installs get that layout from schema.sql directly
+"""
+import asyncio
+import asyncpg
+import os
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+# Triggers before the functions they call, the view before nothing depends on
+# it; no CASCADE so an unexpected dependency fails the migration
+DROP_DUPLICATES = [
+    "DROP TRIGGER IF EXISTS update_category_totals_trigger ON bets",
+    "DROP FUNCTION IF EXISTS update_category_totals()",
+    "DROP TRIGGER IF EXISTS refresh_category_stats_trigger ON bets",
+    "DROP FUNCTION IF EXISTS refresh_category_stats()",
+    "DROP MATERIALIZED VIEW IF EXISTS category_stats",
+    "ALTER TABLE raffle_categories DROP COLUMN IF EXISTS total_amount",
+    "ALTER TABLE raffle_categories DROP COLUMN IF EXISTS bet_count",
+    # The column list only existed to ignore the dropped counter updates
+    "DROP TRIGGER IF EXISTS update_categories_updated_at ON raffle_categories",
+    """CREATE TRIGGER update_categories_updated_at
+        BEFORE UPDATE ON raffle_categories
+        FOR EACH ROW
+        EXECUTE FUNCTION update_updated_at_column()""",
+]
+
+async def migrate_database():
+    """Drop the category total columns, their trigger and the category_stats view"""
+    if not DATABASE_URL.startswith("postgresql"):
+        logger.error("DATABASE_URL must point at PostgreSQL")
+        return
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        async with conn.transaction():
+            for statement in DROP_DUPLICATES:
+                await conn.execute(statement)
+
+        logger.info("Dropped duplicate category totals")
+
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_database())
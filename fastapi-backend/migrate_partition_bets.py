@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert an existing PostgreSQL bets table to the
+hash-partitioned layout defined in schema.sql
+Fresh installs get the partitioned table from schema.sql directly
+"""
+import asyncio
+import asyncpg
+import os
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+BETS_PARTITIONS = 32
+
+# Objects that depend on bets or share its index names; each is dropped
+# explicitly so an unexpected dependency fails the migration instead of
+# being silently removed by CASCADE
+DROP_DEPENDENTS = [
+    "DROP MATERIALIZED VIEW IF EXISTS tenant_stats",
+    # Removed from the schema; gone already if migrate_drop_category_totals.py ran
+    "DROP MATERIALIZED VIEW IF EXISTS category_stats",
+    "DROP INDEX IF EXISTS idx_bets_tenant_category",
+    "DROP INDEX IF EXISTS idx_bets_validation",
+    "DROP INDEX IF EXISTS idx_bets_created",
+    "DROP INDEX IF EXISTS idx_bets_created_id",
+    "DROP INDEX IF EXISTS idx_bets_email",
+    "DROP INDEX IF EXISTS idx_bets_validated_category",
+]
+
+CREATE_PARTITIONED_BETS = """
+    CREATE TABLE bets (
+        id UUID NOT NULL DEFAULT uuid_generate_v4(),
+        tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+        category_id UUID NOT NULL REFERENCES raffle_categories(id) ON DELETE CASCADE,
+        user_name VARCHAR(255) NOT NULL,
+        user_email VARCHAR(255) NOT NULL,
+        bet_value VARCHAR(255) NOT NULL,
+        amount DECIMAL(10, 2) NOT NULL CHECK (amount > 0),
+        is_validated BOOLEAN DEFAULT false,
+        validated_by UUID REFERENCES users(id) ON DELETE SET NULL,
+        validated_at TIMESTAMP WITH TIME ZONE,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        payment_reference VARCHAR(255),
+        PRIMARY KEY (tenant_id, id),
+        FOREIGN KEY (tenant_id, category_id) REFERENCES raffle_categories(tenant_id, id)
+    ) PARTITION BY HASH (tenant_id)
+"""
+
+COPY_BETS = """
+    INSERT INTO bets (
+        id, tenant_id, category_id, user_name, user_email, bet_value, amount,
+        is_validated, validated_by, validated_at, created_at, payment_reference
+    )
+    SELECT
+        id, tenant_id, category_id, user_name, user_email, bet_value, amount,
+        is_validated, validated_by, validated_at, created_at, payment_reference
+    FROM bets_unpartitioned
+"""
+
+# Recreated after the copy, so the rollup triggers don't count
+# rows that are already reflected in their tables
+RECREATE_DEPENDENTS = [
+    "CREATE INDEX idx_bets_tenant_category ON bets(tenant_id, category_id)",
+    "CREATE INDEX idx_bets_validation ON bets(tenant_id, is_validated)",
+    """CREATE INDEX idx_bets_created_id ON bets(tenant_id, created_at DESC, id DESC)
+        INCLUDE (category_id, user_name, user_email, bet_value, amount, is_validated, validated_by, validated_at)""",
+    "CREATE INDEX idx_bets_email ON bets(tenant_id, user_email)",
+    "CREATE INDEX idx_bets_validated_category ON bets(tenant_id, category_id) WHERE is_validated",
+
+    "ALTER TABLE bets ENABLE ROW LEVEL SECURITY",
+    """CREATE POLICY tenant_isolation_bets ON bets
+        FOR ALL
+        USING (tenant_id = (SELECT current_tenant_id()))""",
+
+    """CREATE TRIGGER refresh_tenant_stats_trigger
+        AFTER INSERT OR UPDATE OR DELETE ON bets
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION refresh_tenant_stats()""",
+    """CREATE TRIGGER update_tenant_stats_rollup_trigger
+        AFTER INSERT OR UPDATE OR DELETE ON bets
+        FOR EACH ROW
+        EXECUTE FUNCTION update_tenant_stats_rollup()""",
+    """CREATE TRIGGER update_category_stats_rollup_trigger
+        AFTER INSERT OR DELETE OR UPDATE OF is_validated, amount, category_id ON bets
+        FOR EACH ROW
+        EXECUTE FUNCTION update_category_stats_rollup()""",
+
+    """CREATE MATERIALIZED VIEW tenant_stats AS
+    SELECT
+        t.id as tenant_id,
+        t.subdomain,
+        t.name,
+        t.status,
+        COUNT(DISTINCT b.id) as total_bets,
+        COUNT(DISTINCT b.id) FILTER (WHERE b.is_validated = true) as validated_bets,
+        COALESCE(SUM(b.amount), 0) as total_amount,
+        COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount,
+        COUNT(DISTINCT b.user_email) as unique_users,
+        COUNT(DISTINCT rc.id) as active_categories
+    FROM tenants t
+    LEFT JOIN bets b ON t.id = b.tenant_id
+    LEFT JOIN raffle_categories rc ON t.id = rc.tenant_id AND rc.is_active = true
+    GROUP BY t.id, t.subdomain, t.name, t.status""",
+    "CREATE UNIQUE INDEX idx_tenant_stats_tenant_id ON tenant_stats(tenant_id)",
+]
+
+async def migrate_database():
+    """Move bets into a hash-partitioned table, preserving rows and dependent objects"""
+    if not DATABASE_URL.startswith("postgresql"):
+        logger.error("DATABASE_URL must point at PostgreSQL")
+        return
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        relkind = await conn.fetchval(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass('bets')"
+        )
+        if relkind is None:
+            logger.error("No bets table found; apply schema.sql instead")
+            return
+        if relkind == 'p':
+            logger.info("bets is already partitioned, nothing to do")
+            return
+
+        # One transaction: any failure leaves the original table untouched
+        async with conn.transaction():
+            await conn.execute("LOCK TABLE bets IN ACCESS EXCLUSIVE MODE")
+            row_count = await conn.fetchval("SELECT COUNT(*) FROM bets")
+
+            for statement in DROP_DEPENDENTS:
+                await conn.execute(statement)
+
+            await conn.execute("ALTER TABLE bets RENAME TO bets_unpartitioned")
+            await conn.execute(
+                "ALTER TABLE bets_unpartitioned RENAME CONSTRAINT bets_pkey TO bets_unpartitioned_pkey"
+            )
+
+            await conn.execute(CREATE_PARTITIONED_BETS)
+            for i in range(BETS_PARTITIONS):
+                await conn.execute(
+                    f"CREATE TABLE bets_p{i} PARTITION OF bets "
+                    f"FOR VALUES WITH (MODULUS {BETS_PARTITIONS}, REMAINDER {i})"
+                )
+
+            await conn.execute(COPY_BETS)
+            copied = await conn.fetchval("SELECT COUNT(*) FROM bets")
+            if copied != row_count:
+                raise RuntimeError(f"Copied {copied} of {row_count} bets")
+
+            # Its own indexes, policies and triggers go with it; no CASCADE
+            await conn.execute("DROP TABLE bets_unpartitioned")
+
+            for statement in RECREATE_DEPENDENTS:
+                await conn.execute(statement)
+
+        logger.info(f"Partitioned bets table ({row_count} rows, {BETS_PARTITIONS} partitions)")
+
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_database())
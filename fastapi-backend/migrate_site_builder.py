@@ -25,18 +25,9 @@ async def migrate_site_builder_schema():
         with open('site_builder_schema.sql', 'r') as f:
             schema_sql = f.read()
         
-        # Split by statements and execute them
-        statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
-        
-        for statement in statements:
-            try:
-                await db.execute(statement)
-                print(f"✅ Executed: {statement[:50]}...")
-            except Exception as e:
-                print(f"⚠️  Warning executing statement: {e}")
-                print(f"   Statement: {statement[:100]}...")
-        
-        await db.commit()
+        # Run the whole script in one call and one transaction; statements are
+        # idempotent, so an error aborts and rolls back the migration
+        await db.executescript(f"BEGIN;\n{schema_sql}\nCOMMIT;")
         print("✅ Site builder schema migration completed")
 
 async def check_existing_tables():
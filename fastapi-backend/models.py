@@ -275,6 +275,18 @@ class TenantRecord:
         self.updated_at = record['updated_at']
         self.settings = record['settings'] or {}
 
+class TenantCacheEntry(BaseModel):
+    """Tenant row as stored in the shared cache, so cached tenants keep their column types"""
+    id: str
+    subdomain: str
+    name: str
+    owner_email: str
+    status: str
+    subscription_plan: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    settings: Optional[Dict[str, Any]] = None
+
 class UserRecord:
     def __init__(self, record):
         self.id = str(record['id'])
@@ -412,6 +424,9 @@ class SlideshowImageCreate(BaseModel):
     display_order: int = 0
     is_active: bool = True
 
+class SlideshowImageBatchItem(SlideshowImageCreate):
+    file_id: str
+
 class SlideshowImageResponse(BaseModel):
     id: str
     tenant_id: str
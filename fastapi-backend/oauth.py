@@ -16,7 +16,7 @@ from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import hashes
 import base64
 
-from .models import OAuthProvider, UserRecord, TenantRecord
+from .models import OAuthProvider, UserRecord, TenantRecord, TokenResponse
 from .database import db_manager
 
 logger = logging.getLogger(__name__)
@@ -98,6 +98,22 @@ class OAuthService:
         self.jwt_secret = os.getenv('JWT_SECRET', secrets.token_urlsafe(32))
         self.jwt_algorithm = 'HS256'
         self.access_token_expire_minutes = 1440  # 24 hours
+        self._http_client: Optional[httpx.AsyncClient] = None
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared client so provider connections and TLS sessions are reused"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=300)
+            )
+        return self._http_client
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
     
     def get_authorization_url(self, 
                             provider: OAuthProvider, 
@@ -172,23 +188,23 @@ class OAuthService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    config['token_url'],
-                    data=token_data,
-                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                    timeout=30.0
+            client = self._get_http_client()
+            response = await client.post(
+                config['token_url'],
+                data=token_data,
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                timeout=30.0
+            )
+            
+            if not response.is_success:
+                logger.error(f"Token exchange failed: {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Failed to exchange authorization code"
                 )
-                
-                if not response.is_success:
-                    logger.error(f"Token exchange failed: {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Failed to exchange authorization code"
-                    )
-                
-                return response.json()
-                
+            
+            return response.json()
+            
         except httpx.RequestError as e:
             logger.error(f"Token exchange request failed: {e}")
             raise HTTPException(
@@ -203,26 +219,26 @@ class OAuthService:
         config = self.config.get_config(provider)
         
         try:
-            async with httpx.AsyncClient() as client:
-                if provider == OAuthProvider.GOOGLE:
-                    response = await client.get(
-                        config['userinfo_url'],
-                        headers={'Authorization': f'Bearer {access_token}'},
-                        timeout=30.0
-                    )
-                elif provider == OAuthProvider.APPLE:
-                    # Apple returns user info in ID token
-                    return self._decode_apple_id_token(access_token)
-                
-                if not response.is_success:
-                    logger.error(f"User info request failed: {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Failed to get user information"
-                    )
-                
-                return response.json()
-                
+            client = self._get_http_client()
+            if provider == OAuthProvider.GOOGLE:
+                response = await client.get(
+                    config['userinfo_url'],
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    timeout=30.0
+                )
+            elif provider == OAuthProvider.APPLE:
+                # Apple returns user info in ID token
+                return self._decode_apple_id_token(access_token)
+            
+            if not response.is_success:
+                logger.error(f"User info request failed: {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Failed to get user information"
+                )
+            
+            return response.json()
+            
         except httpx.RequestError as e:
             logger.error(f"User info request failed: {e}")
             raise HTTPException(
@@ -386,7 +402,7 @@ class OAuthService:
                                   provider: OAuthProvider,
                                   code: str,
                                   state: str,
-                                  redirect_uri: str) -> Dict[str, Any]:
+                                  redirect_uri: str) -> TokenResponse:
         """Complete OAuth flow and return user info with tokens"""
         
         # Decode and validate state
@@ -423,23 +439,27 @@ class OAuthService:
         
         logger.info(f"OAuth callback completed for {user.email}, new_user: {is_new_user}")
         
-        return {
-            'access_token': access_token,
-            'token_type': 'bearer',
-            'expires_in': self.access_token_expire_minutes * 60,
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'full_name': user.full_name,
-                'role': user.role
-            },
-            'tenant': {
-                'id': tenant.id,
-                'subdomain': tenant.subdomain,
-                'name': tenant.name
-            } if tenant else None,
-            'is_new_user': is_new_user
-        }
+        # Built from values we just produced; skip re-validation
+        return TokenResponse.model_construct(
+            access_token=access_token,
+            token_type='bearer',
+            expires_in=self.access_token_expire_minutes * 60,
+            tenant_id=tenant.id if tenant else None,
+            user_info={
+                'user': {
+                    'id': user.id,
+                    'email': user.email,
+                    'full_name': user.full_name,
+                    'role': user.role
+                },
+                'tenant': {
+                    'id': tenant.id,
+                    'subdomain': tenant.subdomain,
+                    'name': tenant.name
+                } if tenant else None,
+                'is_new_user': is_new_user
+            }
+        )
 
 # Global OAuth service instance
 oauth_service = OAuthService()
\ No newline at end of file
@@ -11,6 +11,7 @@ from datetime import datetime
 from fastapi import HTTPException, status
 
 from database import db_manager
+from cache import TTLCache
 from site_builder_models import (
     HostingPackage, HostingPackageCreate, HostingPackageUpdate, PackageTier,
     PackageFeature, HostingPackageRecord
@@ -18,14 +19,23 @@ from site_builder_models import (
 
 logger = logging.getLogger(__name__)
 
+PACKAGES_CACHE_TTL = int(os.getenv("PACKAGES_CACHE_TTL", "60"))  # seconds
+
 class PackageService:
     """Service for managing hosting packages and pricing"""
     
     def __init__(self):
         self.stripe_enabled = bool(os.getenv("STRIPE_SECRET_KEY"))
+        self._defaults_initialized = False
+        # Package catalog, pre-indexed by tier; dropped on every package write
+        self._catalog = TTLCache(maxsize=1, ttl=PACKAGES_CACHE_TTL)
     
     async def initialize_default_packages(self):
         """Initialize default hosting packages if none exist"""
+        # Packages are never hard-deleted, so once seeded there's nothing to check
+        if self._defaults_initialized:
+            return
+        
         try:
             async with db_manager.get_connection() as conn:
                 # Check if packages exist
@@ -35,6 +45,9 @@ class PackageService:
                 if count == 0:
                     logger.info("Initializing default hosting packages...")
                     await self._create_default_packages()
+                    self._catalog.clear()
+            
+            self._defaults_initialized = True
                     
         except Exception as e:
             logger.error(f"Failed to initialize default packages: {e}")
@@ -134,37 +147,70 @@ class PackageService:
             await conn.commit()
             logger.info(f"Created {len(default_packages)} default hosting packages")
     
+    async def _get_catalog(self) -> Dict[str, Any]:
+        """All packages in display order, with the active ones indexed by tier"""
+        catalog = self._catalog.get("packages")
+        if catalog is not None:
+            return catalog
+        
+        async with db_manager.get_connection() as conn:
+            result = await conn.execute("""
+                SELECT * FROM hosting_packages 
+                ORDER BY display_order ASC, created_at ASC
+            """)
+            rows = await result.fetchall()
+        
+        packages = []
+        for row in rows:
+            record = HostingPackageRecord(row)
+            packages.append(HostingPackage(
+                id=record.id,
+                tier=record.tier,
+                name=record.name,
+                description=record.description,
+                price_monthly=record.price_monthly,
+                price_yearly=record.price_yearly,
+                stripe_price_id_monthly=record.stripe_price_id_monthly,
+                stripe_price_id_yearly=record.stripe_price_id_yearly,
+                features=record.features,
+                popular=record.popular,
+                is_active=record.is_active,
+                display_order=record.display_order
+            ))
+        
+        active = [package for package in packages if package.is_active]
+        by_tier = {}
+        for package in active:
+            by_tier.setdefault(package.tier, package)
+        
+        catalog = {
+            "all": tuple(packages),
+            "active": tuple(active),
+            "by_tier": by_tier,
+            # Converted to marketing site format once per load
+            "marketing": tuple(
+                {
+                    "id": package.id,
+                    "name": package.name,
+                    "price": package.price_monthly,
+                    "priceYearly": package.price_yearly,
+                    "description": package.description,
+                    "popular": package.popular,
+                    "features": [f.name for f in package.features if f.included],
+                    "tier": package.tier,
+                    "stripeMonthlyPriceId": package.stripe_price_id_monthly,
+                    "stripeYearlyPriceId": package.stripe_price_id_yearly
+                } for package in active
+            )
+        }
+        self._catalog.set("packages", catalog)
+        return catalog
+    
     async def get_all_packages(self, active_only: bool = True) -> List[HostingPackage]:
         """Get all hosting packages"""
         try:
-            async with db_manager.get_connection() as conn:
-                query = """
-                    SELECT * FROM hosting_packages 
-                    {} ORDER BY display_order ASC, created_at ASC
-                """.format("WHERE is_active = 1" if active_only else "")
-                
-                result = await conn.execute(query)
-                rows = await result.fetchall()
-                
-                packages = []
-                for row in rows:
-                    record = HostingPackageRecord(row)
-                    packages.append(HostingPackage(
-                        id=record.id,
-                        tier=record.tier,
-                        name=record.name,
-                        description=record.description,
-                        price_monthly=record.price_monthly,
-                        price_yearly=record.price_yearly,
-                        stripe_price_id_monthly=record.stripe_price_id_monthly,
-                        stripe_price_id_yearly=record.stripe_price_id_yearly,
-                        features=record.features,
-                        popular=record.popular,
-                        is_active=record.is_active,
-                        display_order=record.display_order
-                    ))
-                
-                return packages
+            catalog = await self._get_catalog()
+            return list(catalog["active" if active_only else "all"])
                 
         except Exception as e:
             logger.error(f"Failed to get packages: {e}")
@@ -176,31 +222,8 @@ class PackageService:
     async def get_package_by_tier(self, tier: PackageTier) -> Optional[HostingPackage]:
         """Get package by tier"""
         try:
-            async with db_manager.get_connection() as conn:
-                result = await conn.execute("""
-                    SELECT * FROM hosting_packages 
-                    WHERE tier = ? AND is_active = 1
-                """, (tier,))
-                
-                row = await result.fetchone()
-                if not row:
-                    return None
-                
-                record = HostingPackageRecord(row)
-                return HostingPackage(
-                    id=record.id,
-                    tier=record.tier,
-                    name=record.name,
-                    description=record.description,
-                    price_monthly=record.price_monthly,
-                    price_yearly=record.price_yearly,
-                    stripe_price_id_monthly=record.stripe_price_id_monthly,
-                    stripe_price_id_yearly=record.stripe_price_id_yearly,
-                    features=record.features,
-                    popular=record.popular,
-                    is_active=record.is_active,
-                    display_order=record.display_order
-                )
+            catalog = await self._get_catalog()
+            return catalog["by_tier"].get(tier)
                 
         except Exception as e:
             logger.error(f"Failed to get package by tier {tier}: {e}")
@@ -229,6 +252,7 @@ class PackageService:
                 ))
                 
                 await conn.commit()
+                self._catalog.clear()
                 
                 # Return the created package
                 return HostingPackage(
@@ -310,6 +334,7 @@ class PackageService:
                 
                 await conn.execute(query, tuple(update_values))
                 await conn.commit()
+                self._catalog.clear()
                 
                 # Return updated package
                 result = await conn.execute("""
@@ -355,6 +380,7 @@ class PackageService:
                 """, (datetime.utcnow().isoformat(), package_id))
                 
                 await conn.commit()
+                self._catalog.clear()
                 return result.rowcount > 0
                 
         except Exception as e:
@@ -366,25 +392,16 @@ class PackageService:
     
     async def get_package_for_marketing(self) -> List[Dict[str, Any]]:
         """Get packages formatted for marketing site"""
-        packages = await self.get_all_packages(active_only=True)
-        
-        marketing_packages = []
-        for package in packages:
-            # Convert to marketing site format
-            marketing_packages.append({
-                "id": package.id,
-                "name": package.name,
-                "price": package.price_monthly,
-                "priceYearly": package.price_yearly,
-                "description": package.description,
-                "popular": package.popular,
-                "features": [f.name for f in package.features if f.included],
-                "tier": package.tier,
-                "stripeMonthlyPriceId": package.stripe_price_id_monthly,
-                "stripeYearlyPriceId": package.stripe_price_id_yearly
-            })
-        
-        return marketing_packages
+        try:
+            catalog = await self._get_catalog()
+            return list(catalog["marketing"])
+                
+        except Exception as e:
+            logger.error(f"Failed to get packages: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve hosting packages"
+            )
 
 # Global instance
 package_service = PackageService()
\ No newline at end of file
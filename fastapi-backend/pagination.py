@@ -0,0 +1,19 @@
+"""
+Keyset pagination cursors
+Encodes the (created_at, id) position of the last row on a page as an opaque token
+"""
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+def encode_bets_cursor(bet) -> str:
+    """Opaque, URL-safe cursor for the page after this bet"""
+    keyset = f"{bet['created_at'].isoformat()}|{bet['id']}"
+    return base64.urlsafe_b64encode(keyset.encode()).decode().rstrip("=")
+
+def decode_bets_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(created_at, id) keyset from a cursor; raises ValueError when malformed"""
+    keyset = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    created_at, bet_id = keyset.split("|")
+    return datetime.fromisoformat(created_at), str(uuid.UUID(bet_id))
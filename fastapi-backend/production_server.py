@@ -4,6 +4,7 @@ Production Site Builder Server
 Complete OAuth integration and deployment-ready backend
 """
 from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -19,11 +20,14 @@ import sqlite3
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 import secrets
+import asyncio
+from contextlib import contextmanager
 
 # Try to import PostgreSQL, fall back to SQLite for local development
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
+    from psycopg2.pool import ThreadedConnectionPool
     HAS_POSTGRES = True
 except ImportError:
     HAS_POSTGRES = False
@@ -45,6 +49,8 @@ JWT_SECRET = os.getenv("JWT_SECRET", "PJ5pL6i6W3iAhwEyY5bJ8jW_PFVZIe0YxT3Zcwk3Xy
 BASE_URL = os.getenv("API_URL", "https://api.base2ml.com")
 FRONTEND_URL = os.getenv("BUILDER_URL", "https://builder.base2ml.com")
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
 
 # CORS middleware
 app.add_middleware(
@@ -103,100 +109,128 @@ class UserProfile(BaseModel):
     created_at: datetime
 
 # Database setup
+db_pool = None
+
+@contextmanager
 def get_db_connection():
+    """Borrow a pooled PostgreSQL connection, or open SQLite for local development"""
+    global db_pool
     if HAS_POSTGRES and DATABASE_URL.startswith('postgresql'):
-        return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+        # Reusing connections skips a TCP + TLS handshake per request
+        if db_pool is None:
+            db_pool = ThreadedConnectionPool(
+                DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DATABASE_URL,
+                cursor_factory=RealDictCursor
+            )
+        conn = db_pool.getconn()
+        try:
+            yield conn
+        finally:
+            # The pool rolls back anything left uncommitted
+            db_pool.putconn(conn)
     else:
         # Use SQLite for local development
-        return sqlite3.connect('baby_raffle.db')
+        conn = sqlite3.connect('baby_raffle.db')
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+# Queries run on worker threads; cap them at the pool size so a burst waits
+# here instead of getconn() raising once every pooled connection is lent out
+db_slots = asyncio.Semaphore(DB_POOL_MAX_SIZE)
+
+async def run_db(func, *args):
+    """Run a blocking database function off the event loop"""
+    async with db_slots:
+        return await run_in_threadpool(func, *args)
 
 def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    is_postgres = HAS_POSTGRES and DATABASE_URL.startswith('postgresql')
-    
-    if is_postgres:
-        # PostgreSQL schema
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id VARCHAR(255) PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                name VARCHAR(255) NOT NULL,
-                picture TEXT,
-                provider VARCHAR(50) DEFAULT 'google',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sites (
-                id VARCHAR(255) PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                subdomain VARCHAR(255) UNIQUE NOT NULL,
-                package_tier VARCHAR(255) NOT NULL,
-                configuration TEXT NOT NULL,
-                status VARCHAR(50) DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id VARCHAR(255) PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                site_id VARCHAR(255),
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (site_id) REFERENCES sites (id)
-            )
-        ''')
-    else:
-        # SQLite schema
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                picture TEXT,
-                provider TEXT DEFAULT 'google',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        is_postgres = HAS_POSTGRES and DATABASE_URL.startswith('postgresql')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sites (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                subdomain TEXT UNIQUE NOT NULL,
-                package_tier TEXT NOT NULL,
-                configuration TEXT NOT NULL,
-                status TEXT DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        if is_postgres:
+            # PostgreSQL schema
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id VARCHAR(255) PRIMARY KEY,
+                    email VARCHAR(255) UNIQUE NOT NULL,
+                    name VARCHAR(255) NOT NULL,
+                    picture TEXT,
+                    provider VARCHAR(50) DEFAULT 'google',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sites (
+                    id VARCHAR(255) PRIMARY KEY,
+                    user_id VARCHAR(255) NOT NULL,
+                    subdomain VARCHAR(255) UNIQUE NOT NULL,
+                    package_tier VARCHAR(255) NOT NULL,
+                    configuration TEXT NOT NULL,
+                    status VARCHAR(50) DEFAULT 'active',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id VARCHAR(255) PRIMARY KEY,
+                    user_id VARCHAR(255) NOT NULL,
+                    site_id VARCHAR(255),
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id),
+                    FOREIGN KEY (site_id) REFERENCES sites (id)
+                )
+            ''')
+        else:
+            # SQLite schema
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id TEXT PRIMARY KEY,
+                    email TEXT UNIQUE NOT NULL,
+                    name TEXT NOT NULL,
+                    picture TEXT,
+                    provider TEXT DEFAULT 'google',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sites (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    subdomain TEXT UNIQUE NOT NULL,
+                    package_tier TEXT NOT NULL,
+                    configuration TEXT NOT NULL,
+                    status TEXT DEFAULT 'active',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    site_id TEXT,
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id),
+                    FOREIGN KEY (site_id) REFERENCES sites (id)
+                )
+            ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                site_id TEXT,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (site_id) REFERENCES sites (id)
-            )
-        ''')
-    
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 # Initialize database
 init_db()
@@ -438,6 +472,12 @@ HOSTING_PACKAGES = [
     }
 ]
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled database connections"""
+    if db_pool is not None:
+        db_pool.closeall()
+
 # API Routes
 
 @app.get("/")
@@ -478,7 +518,28 @@ async def oauth_callback(code: str, state: Optional[str] = None):
         user_info = await get_user_info(access_token)
         
         # Store user in database
-        conn = get_db_connection()
+        user_id = await run_db(upsert_oauth_user, user_info)
+        
+        # Create JWT token
+        jwt_token = create_jwt_token({
+            'id': user_id,
+            'email': user_info['email'],
+            'name': user_info['name']
+        })
+        
+        # Redirect to frontend with token
+        return RedirectResponse(
+            url=f"{FRONTEND_URL}?token={jwt_token}&success=true"
+        )
+        
+    except Exception as e:
+        return RedirectResponse(
+            url=f"{FRONTEND_URL}?error=auth_failed&message={str(e)}"
+        )
+
+def upsert_oauth_user(user_info: Dict) -> str:
+    """Create or refresh an OAuth user and return their id"""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         
         user_id = str(uuid.uuid4())
@@ -507,24 +568,8 @@ async def oauth_callback(code: str, state: Optional[str] = None):
                   user_info.get('picture', ''), 'google'))
         
         conn.commit()
-        conn.close()
-        
-        # Create JWT token
-        jwt_token = create_jwt_token({
-            'id': user_id,
-            'email': user_info['email'],
-            'name': user_info['name']
-        })
-        
-        # Redirect to frontend with token
-        return RedirectResponse(
-            url=f"{FRONTEND_URL}?token={jwt_token}&success=true"
-        )
-        
-    except Exception as e:
-        return RedirectResponse(
-            url=f"{FRONTEND_URL}?error=auth_failed&message={str(e)}"
-        )
+    
+    return user_id
 
 @app.get("/auth/user")
 async def get_user(current_user: Dict = Depends(get_current_user)):
@@ -586,48 +631,18 @@ async def save_and_create_account(data: CreateAccountData):
         user_info = await get_user_info(token_data["access_token"])
         
         # Create user
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        user_id = str(uuid.uuid4())
         site_id = str(uuid.uuid4())
         
-        # Check subdomain availability
-        cursor.execute('SELECT id FROM sites WHERE subdomain = %s', (subdomain,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Subdomain already taken")
-        
-        # Create user
-        cursor.execute('''
-            INSERT INTO users (id, email, name, picture, provider)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (email) DO UPDATE SET
-            name = EXCLUDED.name,
-            picture = EXCLUDED.picture,
-            updated_at = CURRENT_TIMESTAMP
-            RETURNING id
-        ''', (user_id, user_info['email'], user_info['name'], 
-              user_info.get('picture', ''), 'google'))
-        
-        result = cursor.fetchone()
-        user_id = result['id']
-        
-        # Create site
         site_config = {
             "subdomain": subdomain,
             "package": data.selected_package,
-            "user_id": user_id,
             "status": "active"
         }
         
-        cursor.execute('''
-            INSERT INTO sites (id, user_id, subdomain, package_tier, configuration, status)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        ''', (site_id, user_id, subdomain, data.selected_package, 
-              json.dumps(site_config), "active"))
-        
-        conn.commit()
-        conn.close()
+        user_id = await run_db(create_user_site, user_info, site_id, subdomain, data.selected_package, site_config)
+        if user_id is None:
+            raise HTTPException(status_code=400, detail="Subdomain already taken")
+        site_config["user_id"] = user_id
         
         # Create site files
         site_dir = f"sites/{subdomain}"
@@ -666,16 +681,57 @@ async def save_and_create_account(data: CreateAccountData):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def create_user_site(user_info: Dict, site_id: str, subdomain: str, package: str, site_config: Dict) -> Optional[str]:
+    """Upsert the user and create their site; returns the user id, or None if the subdomain is taken"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Upsert the user and create the site in one round trip. The user id
+        # (which may be an existing user's) is added to the configuration in
+        # SQL; a taken subdomain inserts no site and returns no row
+        cursor.execute('''
+            WITH u AS (
+                INSERT INTO users (id, email, name, picture, provider)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (email) DO UPDATE SET
+                name = EXCLUDED.name,
+                picture = EXCLUDED.picture,
+                updated_at = CURRENT_TIMESTAMP
+                RETURNING id
+            )
+            INSERT INTO sites (id, user_id, subdomain, package_tier, configuration, status)
+            SELECT %s, u.id, %s, %s, (%s::jsonb || jsonb_build_object('user_id', u.id))::text, %s
+            FROM u
+            ON CONFLICT (subdomain) DO NOTHING
+            RETURNING user_id
+        ''', (str(uuid.uuid4()), user_info['email'], user_info['name'], 
+              user_info.get('picture', ''), 'google',
+              site_id, subdomain, package,
+              json.dumps(site_config), "active"))
+        
+        result = cursor.fetchone()
+        if not result:
+            # Nothing is committed, so the user upsert is discarded too
+            conn.rollback()
+            return None
+        
+        conn.commit()
+    
+    return result['user_id']
+
+def get_user_site(site_id: str, user_id: str):
+    """Fetch a site if it belongs to the user"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM sites WHERE id = %s AND user_id = %s', 
+                       (site_id, user_id))
+        return cursor.fetchone()
+
 @app.get("/admin/{site_id}")
 async def admin_portal(site_id: str, current_user: Dict = Depends(get_current_user)):
     """Admin portal access"""
     # Verify user owns this site
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM sites WHERE id = %s AND user_id = %s', 
-                   (site_id, current_user["user_id"]))
-    site = cursor.fetchone()
-    conn.close()
+    site = await run_db(get_user_site, site_id, current_user["user_id"])
     
     if not site:
         raise HTTPException(status_code=404, detail="Site not found or access denied")
@@ -771,4 +827,4 @@ def generate_admin_html(site_id: str, site_data: tuple) -> str:
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")
\ No newline at end of file
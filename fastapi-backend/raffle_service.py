@@ -2,6 +2,7 @@
 Raffle service for managing bets and categories within tenants
 """
 import logging
+import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from fastapi import HTTPException, status
@@ -32,15 +33,13 @@ class RaffleService:
                         rc.options,
                         rc.display_order,
                         rc.created_at,
-                        COUNT(b.id) as bet_count,
-                        COUNT(b.id) FILTER (WHERE b.is_validated = true) as validated_count,
-                        COALESCE(SUM(b.amount), 0) as total_amount,
-                        COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount
+                        s.bet_count,
+                        s.validated_count,
+                        s.total_amount,
+                        s.validated_amount
                     FROM raffle_categories rc
-                    LEFT JOIN bets b ON rc.id = b.category_id
+                    LEFT JOIN category_stats_rollup s ON s.category_id = rc.id
                     WHERE rc.tenant_id = $1 AND rc.is_active = true
-                    GROUP BY rc.id, rc.category_key, rc.category_name, rc.description,
-                             rc.bet_price, rc.options, rc.display_order, rc.created_at
                     ORDER BY rc.display_order
                 """, tenant_id)
                 
@@ -57,12 +56,12 @@ class RaffleService:
                         "validatedCount": cat['validated_count'] or 0,
                         "totalAmount": float(cat['total_amount'] or 0),
                         "validatedAmount": float(cat['validated_amount'] or 0),
-                        "createdAt": cat['created_at'].isoformat()
+                        "createdAt": cat['created_at']
                     } for cat in categories
                 ]
                 
         except Exception as e:
-            logger.error(f"Failed to get categories for tenant {tenant_id}: {e}")
+            logger.error("Failed to get categories for tenant %s: %s", tenant_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to get raffle categories"
@@ -105,7 +104,7 @@ class RaffleService:
                 category_data.display_order
                 )
                 
-                logger.info(f"Created category '{category_data.category_key}' for tenant {tenant_id} by {created_by}")
+                logger.info("Created category '%s' for tenant %s by %s", category_data.category_key, tenant_id, created_by)
                 
                 return {
                     "id": str(new_category['id']),
@@ -116,13 +115,13 @@ class RaffleService:
                     "options": new_category['options'],
                     "isActive": new_category['is_active'],
                     "displayOrder": new_category['display_order'],
-                    "createdAt": new_category['created_at'].isoformat()
+                    "createdAt": new_category['created_at']
                 }
                 
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Failed to create category for tenant {tenant_id}: {e}")
+            logger.error("Failed to create category for tenant %s: %s", tenant_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create raffle category"
@@ -133,81 +132,100 @@ class RaffleService:
                          submission: BetSubmission) -> Dict[str, Any]:
         """Submit multiple bets for a user"""
         try:
+            # Load every referenced category in one query, before any write
             async with db_manager.get_tenant_connection(tenant_id) as conn:
-                async with conn.transaction():
-                    bet_records = []
-                    total_amount = 0
-                    
-                    for bet in submission.bets:
-                        # Verify category exists and get current price
-                        category = await conn.fetchrow("""
-                            SELECT id, bet_price, is_active, category_name
-                            FROM raffle_categories 
-                            WHERE id = $1 AND tenant_id = $2
-                        """, bet.category_id, tenant_id)
-                        
-                        if not category:
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=f"Category not found: {bet.category_id}"
-                            )
-                        
-                        if not category['is_active']:
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=f"Category '{category['category_name']}' is not active"
-                            )
-                        
-                        # Validate bet amount matches category price
-                        if float(bet.amount) != float(category['bet_price']):
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=f"Bet amount must be ${category['bet_price']}"
-                            )
-                        
-                        # Create bet record
-                        new_bet = await conn.fetchrow("""
-                            INSERT INTO bets (
-                                tenant_id, category_id, user_name, user_email,
-                                bet_value, amount, created_at
-                            )
-                            VALUES ($1, $2, $3, $4, $5, $6, CURRENT_TIMESTAMP)
-                            RETURNING id, created_at
-                        """, 
-                        tenant_id,
-                        bet.category_id,
-                        submission.user_name,
-                        submission.user_email,
-                        bet.bet_value,
-                        bet.amount
-                        )
-                        
-                        bet_record = {
-                            "id": str(new_bet['id']),
-                            "categoryId": bet.category_id,
-                            "categoryName": category['category_name'],
-                            "betValue": bet.bet_value,
-                            "amount": float(bet.amount),
-                            "createdAt": new_bet['created_at'].isoformat()
-                        }
-                        
-                        bet_records.append(bet_record)
-                        total_amount += float(bet.amount)
-                    
-                    logger.info(f"Submitted {len(bet_records)} bets for {submission.user_name} ({submission.user_email}) in tenant {tenant_id}")
-                    
-                    return {
-                        "success": True,
-                        "betCount": len(bet_records),
-                        "totalAmount": total_amount,
-                        "bets": bet_records,
-                        "message": f"Successfully submitted {len(bet_records)} bets"
-                    }
-                    
+                categories = await conn.fetch("""
+                    SELECT id, bet_price, is_active, category_name
+                    FROM raffle_categories 
+                    WHERE tenant_id = $1 AND id = ANY($2::uuid[])
+                """, tenant_id, list({bet.category_id for bet in submission.bets}))
+            categories_by_id = {str(cat['id']): cat for cat in categories}
+            
+            # Response records, insert columns and the total are all built
+            # in this one pass over the submission
+            bet_records = []
+            bet_ids, category_ids, bet_values, amounts = [], [], [], []
+            # Integer cents keep the running total exact
+            total_cents = 0
+            
+            for bet in submission.bets:
+                # Verify category exists and get current price
+                category = categories_by_id.get(bet.category_id)
+                
+                if not category:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Category not found: {bet.category_id}"
+                    )
+                
+                if not category['is_active']:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Category '{category['category_name']}' is not active"
+                    )
+                
+                # Validate bet amount matches category price
+                if float(bet.amount) != float(category['bet_price']):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Bet amount must be ${category['bet_price']}"
+                    )
+                
+                bet_id = str(uuid.uuid4())
+                amount = float(bet.amount)
+                bet_records.append({
+                    "id": bet_id,
+                    "categoryId": bet.category_id,
+                    "categoryName": category['category_name'],
+                    "betValue": bet.bet_value,
+                    "amount": amount
+                })
+                bet_ids.append(bet_id)
+                category_ids.append(bet.category_id)
+                bet_values.append(bet.bet_value)
+                amounts.append(bet.amount)
+                total_cents += round(amount * 100)
+            
+            # The write transaction holds only this single insert; ids are
+            # generated here so each returned row maps back to its bet
+            async with db_manager.get_tenant_connection(tenant_id) as conn:
+                new_bets = await conn.fetch("""
+                    INSERT INTO bets (
+                        id, tenant_id, category_id, user_name, user_email,
+                        bet_value, amount, created_at
+                    )
+                    SELECT b.id, $1, b.category_id, $3, $4, b.bet_value, b.amount, CURRENT_TIMESTAMP
+                    FROM unnest($2::uuid[], $5::uuid[], $6::text[], $7::numeric[]) 
+                        AS b(id, category_id, bet_value, amount)
+                    RETURNING id, created_at
+                """, 
+                tenant_id,
+                bet_ids,
+                submission.user_name,
+                submission.user_email,
+                category_ids,
+                bet_values,
+                amounts
+                )
+            
+            created_at_by_id = {str(new_bet['id']): new_bet['created_at'] for new_bet in new_bets}
+            for record in bet_records:
+                record["createdAt"] = created_at_by_id[record['id']]
+            
+            logger.info("Submitted %s bets for %s (%s) in tenant %s", len(bet_records), submission.user_name, submission.user_email, tenant_id)
+            
+            return {
+                "success": True,
+                "betCount": len(bet_records),
+                "totalAmount": total_cents / 100,
+                "bets": bet_records,
+                "message": f"Successfully submitted {len(bet_records)} bets"
+            }
+            
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Failed to submit bets for tenant {tenant_id}: {e}")
+            logger.error("Failed to submit bets for tenant %s: %s", tenant_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to submit bets"
@@ -268,13 +286,13 @@ class RaffleService:
                         "amount": float(bet['amount']),
                         "isValidated": bet['is_validated'],
                         "validatedBy": bet['validated_by_name'],
-                        "validatedAt": bet['validated_at'].isoformat() if bet['validated_at'] else None,
-                        "createdAt": bet['created_at'].isoformat()
+                        "validatedAt": bet['validated_at'],
+                        "createdAt": bet['created_at']
                     } for bet in bets
                 ]
                 
         except Exception as e:
-            logger.error(f"Failed to get bets for tenant {tenant_id}: {e}")
+            logger.error("Failed to get bets for tenant %s: %s", tenant_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to get bets"
@@ -286,49 +304,54 @@ class RaffleService:
                           validated_by_user: UserRecord) -> Dict[str, Any]:
         """Validate/approve bets (admin operation)"""
         try:
+            # Repeated ids would otherwise make the existence check fail
+            bet_ids = list(set(bet_ids))
+            
             async with db_manager.get_tenant_connection(tenant_id) as conn:
                 async with conn.transaction():
-                    # Verify all bets exist and belong to tenant
-                    existing_bets = await conn.fetch("""
-                        SELECT id, user_name, user_email, is_validated
-                        FROM bets 
-                        WHERE tenant_id = $1 AND id = ANY($2)
-                    """, tenant_id, bet_ids)
+                    # Check existence and flip only the unvalidated bets in one
+                    # round trip; both CTEs see the same snapshot
+                    result = await conn.fetchrow("""
+                        WITH found AS (
+                            SELECT id FROM bets
+                            WHERE tenant_id = $2 AND id = ANY($3)
+                        ), updated AS (
+                            UPDATE bets 
+                            SET is_validated = true,
+                                validated_by = $1,
+                                validated_at = CURRENT_TIMESTAMP
+                            WHERE tenant_id = $2 AND id = ANY($3) AND is_validated = false
+                            RETURNING id
+                        )
+                        SELECT (SELECT COUNT(*) FROM found) as found_count,
+                               (SELECT COUNT(*) FROM updated) as updated_count
+                    """, validated_by_user.id, tenant_id, bet_ids)
                     
-                    if len(existing_bets) != len(bet_ids):
+                    # Raising here rolls the update back with the transaction
+                    if result['found_count'] != len(bet_ids):
                         raise HTTPException(
                             status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Some bet IDs are invalid or don't belong to this tenant"
                         )
                     
-                    # Update bets to validated
-                    result = await conn.execute("""
-                        UPDATE bets 
-                        SET is_validated = true,
-                            validated_by = $1,
-                            validated_at = CURRENT_TIMESTAMP
-                        WHERE tenant_id = $2 AND id = ANY($3) AND is_validated = false
-                    """, validated_by_user.id, tenant_id, bet_ids)
-                    
-                    # Parse result to get actual updated count
-                    updated_count = int(result.split()[-1]) if result else 0
+                    updated_count = result['updated_count']
                     already_validated = len(bet_ids) - updated_count
                     
-                    logger.info(f"Validated {updated_count} bets for tenant {tenant_id} by {validated_by_user.full_name}")
+                    logger.info("Validated %s bets for tenant %s by %s", updated_count, tenant_id, validated_by_user.full_name)
                     
                     return {
                         "success": True,
                         "validatedCount": updated_count,
                         "alreadyValidated": already_validated,
                         "validatedBy": validated_by_user.full_name,
-                        "validatedAt": datetime.utcnow().isoformat(),
+                        "validatedAt": datetime.utcnow(),
                         "message": f"Validated {updated_count} bets"
                     }
                     
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Failed to validate bets for tenant {tenant_id}: {e}")
+            logger.error("Failed to validate bets for tenant %s: %s", tenant_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to validate bets"
@@ -338,38 +361,34 @@ class RaffleService:
         """Get comprehensive betting statistics for a tenant"""
         try:
             async with db_manager.get_tenant_connection(tenant_id) as conn:
-                # Get overall stats
-                overall_stats = await conn.fetchrow("""
-                    SELECT 
-                        COUNT(b.id) as total_bets,
-                        COUNT(b.id) FILTER (WHERE b.is_validated = true) as validated_bets,
-                        COALESCE(SUM(b.amount), 0) as total_amount,
-                        COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount,
-                        COUNT(DISTINCT b.user_email) as unique_users,
-                        COUNT(DISTINCT rc.id) as active_categories
-                    FROM tenants t
-                    LEFT JOIN bets b ON t.id = b.tenant_id
-                    LEFT JOIN raffle_categories rc ON t.id = rc.tenant_id AND rc.is_active = true
-                    WHERE t.id = $1
-                    GROUP BY t.id
-                """, tenant_id)
-                
-                # Get category breakdown
-                category_stats = await conn.fetch("""
+                # Totals come from trigger-maintained rollups; only the distinct
+                # user count still needs the bets table (via the stats view).
+                # One row per active category carries the tenant totals too, so
+                # the overall and per-category figures share a round trip
+                rows = await conn.fetch("""
                     SELECT 
+                        r.total_bets,
+                        r.validated_bets,
+                        r.total_amount as tenant_total_amount,
+                        r.validated_amount as tenant_validated_amount,
+                        ts.unique_users,
                         rc.category_key,
                         rc.category_name,
-                        COUNT(b.id) as bet_count,
-                        COUNT(b.id) FILTER (WHERE b.is_validated = true) as validated_count,
-                        COALESCE(SUM(b.amount), 0) as total_amount,
-                        COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount
-                    FROM raffle_categories rc
-                    LEFT JOIN bets b ON rc.id = b.category_id
-                    WHERE rc.tenant_id = $1 AND rc.is_active = true
-                    GROUP BY rc.category_key, rc.category_name
+                        s.bet_count,
+                        s.validated_count,
+                        s.total_amount,
+                        s.validated_amount
+                    FROM (SELECT $1::uuid as tenant_id) t
+                    LEFT JOIN tenant_stats_rollup r ON r.tenant_id = t.tenant_id
+                    LEFT JOIN tenant_stats ts ON ts.tenant_id = t.tenant_id
+                    LEFT JOIN raffle_categories rc ON rc.tenant_id = t.tenant_id AND rc.is_active = true
+                    LEFT JOIN category_stats_rollup s ON s.category_id = rc.id
                     ORDER BY rc.display_order
                 """, tenant_id)
                 
+                overall_stats = rows[0]
+                category_stats = [row for row in rows if row['category_key'] is not None]
+                
                 # Get recent activity
                 recent_bets = await conn.fetch("""
                     SELECT 
@@ -391,10 +410,10 @@ class RaffleService:
                     "overall": {
                         "totalBets": overall_stats['total_bets'] or 0,
                         "validatedBets": overall_stats['validated_bets'] or 0,
-                        "totalAmount": float(overall_stats['total_amount'] or 0),
-                        "validatedAmount": float(overall_stats['validated_amount'] or 0),
+                        "totalAmount": float(overall_stats['tenant_total_amount'] or 0),
+                        "validatedAmount": float(overall_stats['tenant_validated_amount'] or 0),
                         "uniqueUsers": overall_stats['unique_users'] or 0,
-                        "activeCategories": overall_stats['active_categories'] or 0
+                        "activeCategories": len(category_stats)
                     },
                     "categories": [
                         {
@@ -414,13 +433,13 @@ class RaffleService:
                             "betValue": bet['bet_value'],
                             "amount": float(bet['amount']),
                             "isValidated": bet['is_validated'],
-                            "createdAt": bet['created_at'].isoformat()
+                            "createdAt": bet['created_at']
                         } for bet in recent_bets
                     ]
                 }
                 
         except Exception as e:
-            logger.error(f"Failed to get betting stats for tenant {tenant_id}: {e}")
+            logger.error("Failed to get betting stats for tenant %s: %s", tenant_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to get betting statistics"
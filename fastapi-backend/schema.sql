@@ -63,9 +63,11 @@ CREATE TABLE IF NOT EXISTS raffle_categories (
     UNIQUE(tenant_id, category_key)
 );
 
--- User bets with tenant isolation
+-- User bets with tenant isolation, hash-partitioned by tenant so every
+-- tenant-scoped query is pruned to a single, smaller partition. Databases
+-- created before partitioning are converted by migrate_partition_bets.py
 CREATE TABLE IF NOT EXISTS bets (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
     category_id UUID NOT NULL REFERENCES raffle_categories(id) ON DELETE CASCADE,
     user_name VARCHAR(255) NOT NULL,
@@ -78,9 +80,23 @@ CREATE TABLE IF NOT EXISTS bets (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     payment_reference VARCHAR(255),
     
+    -- The partition key must be part of the primary key
+    PRIMARY KEY (tenant_id, id),
+    
     -- Ensure category belongs to same tenant
     FOREIGN KEY (tenant_id, category_id) REFERENCES raffle_categories(tenant_id, id)
-);
+) PARTITION BY HASH (tenant_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..31 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS bets_p%s PARTITION OF bets FOR VALUES WITH (MODULUS 32, REMAINDER %s)',
+            i, i
+        );
+    END LOOP;
+END
+$$;
 
 -- OAuth sessions and tokens
 CREATE TABLE IF NOT EXISTS oauth_sessions (
@@ -111,6 +127,53 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Uploaded files and slideshow entries
+CREATE TABLE IF NOT EXISTS files (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    filename VARCHAR(255) NOT NULL,
+    original_filename VARCHAR(255) NOT NULL,
+    file_path TEXT NOT NULL,
+    url TEXT NOT NULL,
+    size INTEGER NOT NULL CHECK (size > 0),
+    content_type VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS slideshow_images (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    file_id UUID NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    title VARCHAR(255),
+    caption TEXT,
+    display_order INTEGER DEFAULT 0,
+    is_active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-tenant bet totals maintained incrementally by triggers on bets
+CREATE TABLE IF NOT EXISTS tenant_stats_rollup (
+    tenant_id UUID PRIMARY KEY REFERENCES tenants(id) ON DELETE CASCADE,
+    total_bets BIGINT NOT NULL DEFAULT 0,
+    validated_bets BIGINT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    validated_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-category bet totals maintained incrementally by triggers on bets; the
+-- single source for category totals (validated_* are what /api/categories shows)
+CREATE TABLE IF NOT EXISTS category_stats_rollup (
+    category_id UUID PRIMARY KEY REFERENCES raffle_categories(id) ON DELETE CASCADE,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    bet_count BIGINT NOT NULL DEFAULT 0,
+    validated_count BIGINT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    validated_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Performance indexes
 CREATE INDEX IF NOT EXISTS idx_users_tenant_email ON users(tenant_id, email);
 CREATE INDEX IF NOT EXISTS idx_users_oauth ON users(oauth_provider, oauth_id) WHERE oauth_provider IS NOT NULL;
@@ -121,10 +184,16 @@ CREATE INDEX IF NOT EXISTS idx_categories_key ON raffle_categories(tenant_id, ca
 
 CREATE INDEX IF NOT EXISTS idx_bets_tenant_category ON bets(tenant_id, category_id);
 CREATE INDEX IF NOT EXISTS idx_bets_validation ON bets(tenant_id, is_validated);
-CREATE INDEX IF NOT EXISTS idx_bets_created ON bets(tenant_id, created_at DESC);
+DROP INDEX IF EXISTS idx_bets_created;
+CREATE INDEX IF NOT EXISTS idx_bets_created_id ON bets(tenant_id, created_at DESC, id DESC)
+    INCLUDE (category_id, user_name, user_email, bet_value, amount, is_validated, validated_by, validated_at);
 CREATE INDEX IF NOT EXISTS idx_bets_email ON bets(tenant_id, user_email);
+CREATE INDEX IF NOT EXISTS idx_bets_validated_category ON bets(tenant_id, category_id) WHERE is_validated;
 
 CREATE INDEX IF NOT EXISTS idx_audit_tenant_created ON audit_logs(tenant_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_files_tenant_created ON files(tenant_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_slideshow_tenant_order ON slideshow_images(tenant_id, is_active, display_order, created_at);
+
 CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs(user_id, created_at DESC) WHERE user_id IS NOT NULL;
 
 -- Row-Level Security (RLS) Policies
@@ -134,6 +203,22 @@ ALTER TABLE raffle_categories ENABLE ROW LEVEL SECURITY;
 ALTER TABLE bets ENABLE ROW LEVEL SECURITY;
 ALTER TABLE oauth_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE audit_logs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE files ENABLE ROW LEVEL SECURITY;
+ALTER TABLE slideshow_images ENABLE ROW LEVEL SECURITY;
+ALTER TABLE tenant_stats_rollup ENABLE ROW LEVEL SECURITY;
+ALTER TABLE category_stats_rollup ENABLE ROW LEVEL SECURITY;
+
+-- Current tenant from the session context. Policies call it as
+-- (SELECT current_tenant_id()) so the planner runs it once per query as an
+-- InitPlan and can use the result as an index condition on tenant_id instead
+-- of filtering every row of a seq scan.
+CREATE OR REPLACE FUNCTION current_tenant_id()
+RETURNS UUID AS $$
+    SELECT COALESCE(
+        NULLIF(current_setting('app.current_tenant_id', true), '')::uuid,
+        '00000000-0000-0000-0000-000000000000'::uuid
+    );
+$$ LANGUAGE sql STABLE PARALLEL SAFE;
 
 -- RLS Policies for tenant isolation
 
@@ -146,34 +231,53 @@ CREATE POLICY tenant_isolation_super_admin ON tenants
 -- Regular access: tenant can only see themselves
 CREATE POLICY tenant_isolation_self ON tenants
     FOR ALL 
-    USING (id = COALESCE(current_setting('app.current_tenant_id', true)::uuid, '00000000-0000-0000-0000-000000000000'));
+    USING (id = (SELECT current_tenant_id()));
 
 -- Users can only see users in their tenant
 CREATE POLICY tenant_isolation_users ON users 
     FOR ALL 
-    USING (tenant_id = COALESCE(current_setting('app.current_tenant_id', true)::uuid, '00000000-0000-0000-0000-000000000000'));
+    USING (tenant_id = (SELECT current_tenant_id()));
 
 -- Categories are tenant-isolated
 CREATE POLICY tenant_isolation_categories ON raffle_categories 
     FOR ALL 
-    USING (tenant_id = COALESCE(current_setting('app.current_tenant_id', true)::uuid, '00000000-0000-0000-0000-000000000000'));
+    USING (tenant_id = (SELECT current_tenant_id()));
 
 -- Bets are tenant-isolated  
 CREATE POLICY tenant_isolation_bets ON bets 
     FOR ALL 
-    USING (tenant_id = COALESCE(current_setting('app.current_tenant_id', true)::uuid, '00000000-0000-0000-0000-000000000000'));
+    USING (tenant_id = (SELECT current_tenant_id()));
 
 -- OAuth sessions are tenant-isolated
 CREATE POLICY tenant_isolation_oauth ON oauth_sessions 
     FOR ALL 
-    USING (tenant_id = COALESCE(current_setting('app.current_tenant_id', true)::uuid, '00000000-0000-0000-0000-000000000000'));
+    USING (tenant_id = (SELECT current_tenant_id()));
 
 -- Audit logs are tenant-isolated
 CREATE POLICY tenant_isolation_audit ON audit_logs 
     FOR ALL 
-    USING (tenant_id = COALESCE(current_setting('app.current_tenant_id', true)::uuid, '00000000-0000-0000-0000-000000000000') 
+    USING (tenant_id = (SELECT current_tenant_id()) 
            OR current_user = 'postgres'); -- Super admin can see all
 
+-- Files are tenant-isolated
+CREATE POLICY tenant_isolation_files ON files 
+    FOR ALL 
+    USING (tenant_id = (SELECT current_tenant_id()));
+
+-- Slideshow images are tenant-isolated
+CREATE POLICY tenant_isolation_slideshow ON slideshow_images 
+    FOR ALL 
+    USING (tenant_id = (SELECT current_tenant_id()));
+
+-- Stats rollups are tenant-isolated
+CREATE POLICY tenant_isolation_stats_rollup ON tenant_stats_rollup 
+    FOR ALL 
+    USING (tenant_id = (SELECT current_tenant_id()));
+
+CREATE POLICY tenant_isolation_category_rollup ON category_stats_rollup 
+    FOR ALL 
+    USING (tenant_id = (SELECT current_tenant_id()));
+
 -- Materialized view for tenant statistics (performance optimization)
 CREATE MATERIALIZED VIEW IF NOT EXISTS tenant_stats AS
 SELECT 
@@ -195,25 +299,6 @@ GROUP BY t.id, t.subdomain, t.name, t.status;
 -- Unique index for materialized view refresh
 CREATE UNIQUE INDEX IF NOT EXISTS idx_tenant_stats_tenant_id ON tenant_stats(tenant_id);
 
--- Category statistics view
-CREATE MATERIALIZED VIEW IF NOT EXISTS category_stats AS
-SELECT 
-    rc.id as category_id,
-    rc.tenant_id,
-    rc.category_key,
-    rc.category_name,
-    COUNT(b.id) as bet_count,
-    COUNT(b.id) FILTER (WHERE b.is_validated = true) as validated_count,
-    COALESCE(SUM(b.amount), 0) as total_amount,
-    COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount
-FROM raffle_categories rc
-LEFT JOIN bets b ON rc.id = b.category_id
-WHERE rc.is_active = true
-GROUP BY rc.id, rc.tenant_id, rc.category_key, rc.category_name;
-
--- Unique index for category stats
-CREATE UNIQUE INDEX IF NOT EXISTS idx_category_stats_category_id ON category_stats(category_id);
-
 -- Functions for materialized view refresh
 CREATE OR REPLACE FUNCTION refresh_tenant_stats()
 RETURNS TRIGGER AS $$
@@ -224,25 +309,123 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE OR REPLACE FUNCTION refresh_category_stats()  
+-- Triggers for automatic stats refresh
+CREATE TRIGGER refresh_tenant_stats_trigger
+    AFTER INSERT OR UPDATE OR DELETE ON bets
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION refresh_tenant_stats();
+
+-- Incremental maintenance of tenant_stats_rollup: subtract the old row, add the new one
+CREATE OR REPLACE FUNCTION update_tenant_stats_rollup()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- Refresh category stats in background
-    PERFORM pg_notify('refresh_stats', 'category_stats');
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE tenant_stats_rollup SET
+            total_bets = total_bets - 1,
+            validated_bets = validated_bets - CASE WHEN OLD.is_validated THEN 1 ELSE 0 END,
+            total_amount = total_amount - OLD.amount,
+            validated_amount = validated_amount - CASE WHEN OLD.is_validated THEN OLD.amount ELSE 0 END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE tenant_id = OLD.tenant_id;
+    END IF;
+    
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO tenant_stats_rollup AS r (
+            tenant_id, total_bets, validated_bets, total_amount, validated_amount
+        )
+        VALUES (
+            NEW.tenant_id,
+            1,
+            CASE WHEN NEW.is_validated THEN 1 ELSE 0 END,
+            NEW.amount,
+            CASE WHEN NEW.is_validated THEN NEW.amount ELSE 0 END
+        )
+        ON CONFLICT (tenant_id) DO UPDATE SET
+            total_bets = r.total_bets + EXCLUDED.total_bets,
+            validated_bets = r.validated_bets + EXCLUDED.validated_bets,
+            total_amount = r.total_amount + EXCLUDED.total_amount,
+            validated_amount = r.validated_amount + EXCLUDED.validated_amount,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Triggers for automatic stats refresh
-CREATE TRIGGER refresh_tenant_stats_trigger
+CREATE TRIGGER update_tenant_stats_rollup_trigger
     AFTER INSERT OR UPDATE OR DELETE ON bets
-    FOR EACH STATEMENT
-    EXECUTE FUNCTION refresh_tenant_stats();
+    FOR EACH ROW
+    EXECUTE FUNCTION update_tenant_stats_rollup();
 
-CREATE TRIGGER refresh_category_stats_trigger
-    AFTER INSERT OR UPDATE OR DELETE ON bets
-    FOR EACH STATEMENT  
-    EXECUTE FUNCTION refresh_category_stats();
+-- Backfill rollups for bets that predate the trigger
+INSERT INTO tenant_stats_rollup (tenant_id, total_bets, validated_bets, total_amount, validated_amount)
+SELECT 
+    tenant_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE is_validated = true),
+    COALESCE(SUM(amount), 0),
+    COALESCE(SUM(amount) FILTER (WHERE is_validated = true), 0)
+FROM bets
+GROUP BY tenant_id
+ON CONFLICT (tenant_id) DO NOTHING;
+
+-- Incremental maintenance of category_stats_rollup, same subtract/add scheme
+CREATE OR REPLACE FUNCTION update_category_stats_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE category_stats_rollup SET
+            bet_count = bet_count - 1,
+            validated_count = validated_count - CASE WHEN OLD.is_validated THEN 1 ELSE 0 END,
+            total_amount = total_amount - OLD.amount,
+            validated_amount = validated_amount - CASE WHEN OLD.is_validated THEN OLD.amount ELSE 0 END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE category_id = OLD.category_id;
+    END IF;
+    
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO category_stats_rollup AS r (
+            category_id, tenant_id, bet_count, validated_count, total_amount, validated_amount
+        )
+        VALUES (
+            NEW.category_id,
+            NEW.tenant_id,
+            1,
+            CASE WHEN NEW.is_validated THEN 1 ELSE 0 END,
+            NEW.amount,
+            CASE WHEN NEW.is_validated THEN NEW.amount ELSE 0 END
+        )
+        ON CONFLICT (category_id) DO UPDATE SET
+            bet_count = r.bet_count + EXCLUDED.bet_count,
+            validated_count = r.validated_count + EXCLUDED.validated_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount,
+            validated_amount = r.validated_amount + EXCLUDED.validated_amount,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_category_stats_rollup_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF is_validated, amount, category_id ON bets
+    FOR EACH ROW
+    EXECUTE FUNCTION update_category_stats_rollup();
+
+-- Backfill category rollups for bets that predate the trigger
+INSERT INTO category_stats_rollup (
+    category_id, tenant_id, bet_count, validated_count, total_amount, validated_amount
+)
+SELECT 
+    category_id,
+    tenant_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE is_validated = true),
+    COALESCE(SUM(amount), 0),
+    COALESCE(SUM(amount) FILTER (WHERE is_validated = true), 0)
+FROM bets
+GROUP BY category_id, tenant_id
+ON CONFLICT (category_id) DO NOTHING;
 
 -- Trigger for updating updated_at timestamps
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -402,10 +585,11 @@ $$ LANGUAGE plpgsql SECURITY DEFINER;
 
 -- Initial refresh of materialized views
 REFRESH MATERIALIZED VIEW tenant_stats;
-REFRESH MATERIALIZED VIEW category_stats;
 
 -- Grant appropriate permissions
 GRANT USAGE ON SCHEMA public TO postgres;
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO postgres;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO postgres;
-GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public TO postgres;
\ No newline at end of file
+GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public TO postgres;
+
+-- The cross-tenant reporting role needs superuser to create; see schema_superuser.sql
\ No newline at end of file
@@ -14,7 +14,8 @@ CREATE TABLE IF NOT EXISTS tenants (
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE,
     subscription_tier TEXT DEFAULT 'free' CHECK (subscription_tier IN ('free', 'premium', 'enterprise')),
-    settings TEXT DEFAULT '{}' -- JSON string for tenant-specific settings
+    settings TEXT DEFAULT '{}', -- JSON string for tenant-specific settings
+    stripe_customer_id TEXT -- Older databases get this column from migrate_payments_schema.py
 );
 
 -- Users table  
@@ -221,9 +222,6 @@ CREATE TABLE IF NOT EXISTS deployments (
     FOREIGN KEY (tenant_id) REFERENCES tenants (id) ON DELETE CASCADE
 );
 
--- Add stripe_customer_id to tenants table
-ALTER TABLE tenants ADD COLUMN stripe_customer_id TEXT;
-
 -- Create additional indexes for new tables
 CREATE INDEX IF NOT EXISTS idx_payments_tenant ON payments (tenant_id);
 CREATE INDEX IF NOT EXISTS idx_payments_stripe_intent ON payments (stripe_payment_intent_id);
@@ -235,6 +233,7 @@ CREATE INDEX IF NOT EXISTS idx_subscriptions_status ON subscriptions (status);
 
 CREATE INDEX IF NOT EXISTS idx_files_tenant ON files (tenant_id);
 CREATE INDEX IF NOT EXISTS idx_files_created_at ON files (created_at);
+CREATE INDEX IF NOT EXISTS idx_files_tenant_created ON files (tenant_id, created_at DESC);
 
 CREATE INDEX IF NOT EXISTS idx_slideshow_tenant_active ON slideshow_images (tenant_id, is_active);
 CREATE INDEX IF NOT EXISTS idx_slideshow_display_order ON slideshow_images (display_order);
@@ -0,0 +1,17 @@
+-- Superuser-only setup, applied after schema.sql
+-- BYPASSRLS can only be granted by a superuser, so this is kept out of the
+-- main schema. The docker-entrypoint-initdb.d init runs as the postgres
+-- superuser; on managed databases run it once as the admin/superuser:
+--   psql "$DATABASE_URL" -f schema_superuser.sql
+
+-- Role for admin/reporting jobs that need to read across tenants
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'baby_raffle_reporting') THEN
+        CREATE ROLE baby_raffle_reporting NOLOGIN BYPASSRLS;
+    END IF;
+END
+$$;
+
+GRANT USAGE ON SCHEMA public TO baby_raffle_reporting;
+GRANT SELECT ON ALL TABLES IN SCHEMA public TO baby_raffle_reporting;
@@ -28,13 +28,12 @@ class SiteBuilderService:
         self.base_domain = os.getenv("BASE_DOMAIN", "base2ml.com")
         self.builder_domain = f"builder.{self.base_domain}"
         self.preview_domain = f"preview.{self.base_domain}"
+        # DEFAULT_THEMES is static, so validate it once
+        self.themes = tuple(ThemeConfig(**theme_data) for theme_data in DEFAULT_THEMES)
     
     async def get_available_themes(self) -> List[ThemeConfig]:
         """Get all available themes"""
-        themes = []
-        for theme_data in DEFAULT_THEMES:
-            themes.append(ThemeConfig(**theme_data))
-        return themes
+        return list(self.themes)
     
     async def create_anonymous_builder(self, builder_data: SiteBuilderCreate) -> SiteBuilderResponse:
         """Create anonymous site builder session"""
@@ -4,6 +4,7 @@ Manages tenant-specific site settings and triggers deployments
 """
 import os
 import json
+import asyncio
 import uuid
 import logging
 import subprocess
@@ -12,6 +13,7 @@ from datetime import datetime
 from fastapi import HTTPException, status
 
 from database import db_manager
+from debounce import WriteDebouncer
 from models import (
     SiteConfigUpdate, SiteConfigResponse, SiteConfigRecord,
     DeploymentRequest, DeploymentResponse
@@ -54,6 +56,12 @@ class SiteConfigService:
     def __init__(self):
         self.deployment_webhook_url = os.getenv("DEPLOYMENT_WEBHOOK_URL")
         self.base_domain = os.getenv("BASE_DOMAIN", "base2ml.com")
+        
+        # Partial updates arriving in a burst are merged and written once per tenant
+        self._config_updates = WriteDebouncer(
+            self._write_site_config,
+            merge=lambda pending, update: {**pending, **update}
+        )
     
     async def get_site_config(self, tenant_id: str) -> SiteConfigRecord:
         """Get site configuration for tenant"""
@@ -129,15 +137,21 @@ class SiteConfigService:
         updates: SiteConfigUpdate
     ) -> SiteConfigResponse:
         """Update site configuration"""
+        # Only provided fields are merged. Each caller's fields are validated
+        # before joining a burst, so an invalid update fails only its own
+        # request; a failed write fails the whole burst, none of which was saved
+        update_dict = updates.dict(exclude_unset=True)
+        self._validate_config(update_dict)
+        return await self._config_updates.submit(tenant_id, update_dict)
+    
+    async def _write_site_config(self, tenant_id: str, update_dict: Dict[str, Any]) -> SiteConfigResponse:
+        """Apply the merged updates for a tenant in one write"""
         try:
             # Get existing config
             current_config = await self.get_site_config(tenant_id)
             
             # Merge updates
             new_config = current_config.config.copy()
-            
-            # Update only provided fields
-            update_dict = updates.dict(exclude_unset=True)
             new_config.update(update_dict)
             
             # Validate configuration
@@ -386,8 +400,9 @@ class SiteConfigService:
                     LIMIT ?
                 """, tenant_id, limit)
                 
+                # Trusted DB rows: skip per-field validation
                 return [
-                    DeploymentResponse(
+                    DeploymentResponse.model_construct(
                         id=str(result['id']),
                         tenant_id=str(result['tenant_id']),
                         status=result['status'],
@@ -404,35 +419,45 @@ class SiteConfigService:
     async def get_site_preview_data(self, tenant_id: str) -> Dict[str, Any]:
         """Get all data needed for site preview"""
         try:
-            # Get site config
-            site_config = await self.get_site_config(tenant_id)
+            async def fetch_categories():
+                async with db_manager.get_connection() as conn:
+                    # Validated totals come from the trigger-maintained rollup,
+                    # the same figures /api/categories shows; no bets are scanned
+                    return await conn.fetch("""
+                        SELECT rc.*, 
+                               COALESCE(s.validated_amount, 0) as total_amount,
+                               COALESCE(s.validated_count, 0) as bet_count
+                        FROM raffle_categories rc
+                        LEFT JOIN category_stats_rollup s ON s.category_id = rc.id
+                        WHERE rc.tenant_id = ? AND rc.is_active = true
+                        ORDER BY rc.display_order
+                    """, tenant_id)
             
-            # Get raffle categories
-            async with db_manager.get_connection() as conn:
-                categories = await conn.fetch("""
-                    SELECT rc.*, 
-                           COALESCE(SUM(b.amount), 0) as total_amount,
-                           COUNT(b.id) as bet_count
-                    FROM raffle_categories rc
-                    LEFT JOIN bets b ON rc.id = b.category_id AND b.is_validated = true
-                    WHERE rc.tenant_id = ? AND rc.is_active = true
-                    GROUP BY rc.id
-                    ORDER BY rc.display_order
-                """, tenant_id)
-                
-                # Get slideshow images
-                slideshow_images = await conn.fetch("""
-                    SELECT si.*, f.url
-                    FROM slideshow_images si
-                    JOIN files f ON si.file_id = f.id
-                    WHERE si.tenant_id = ? AND si.is_active = 1
-                    ORDER BY si.display_order, si.created_at
-                """, tenant_id)
-                
-                # Get tenant info
-                tenant = await conn.fetchone("""
-                    SELECT subdomain, name, owner_email FROM tenants WHERE id = ?
-                """, tenant_id)
+            async def fetch_slideshow_images():
+                async with db_manager.get_connection() as conn:
+                    return await conn.fetch("""
+                        SELECT si.*, f.url
+                        FROM slideshow_images si
+                        JOIN files f ON si.file_id = f.id
+                        WHERE si.tenant_id = ? AND si.is_active = 1
+                        ORDER BY si.display_order, si.created_at
+                    """, tenant_id)
+            
+            async def fetch_tenant():
+                async with db_manager.get_connection() as conn:
+                    return await conn.fetchone("""
+                        SELECT subdomain, name, owner_email FROM tenants WHERE id = ?
+                    """, tenant_id)
+            
+            # Independent reads. On PostgreSQL each takes its own pooled connection
+            # so they overlap; SQLite has one shared connection, so there they
+            # still run one after another
+            site_config, categories, slideshow_images, tenant = await asyncio.gather(
+                self.get_site_config(tenant_id),
+                fetch_categories(),
+                fetch_slideshow_images(),
+                fetch_tenant()
+            )
             
             return {
                 "config": site_config.config,
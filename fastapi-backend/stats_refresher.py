@@ -0,0 +1,127 @@
+"""
+Background refresh of the statistics materialized views
+Listens for the refresh_stats notifications raised by the bets triggers in schema.sql
+"""
+import os
+import asyncio
+import logging
+from typing import Optional, Set
+
+try:
+    import asyncpg
+    HAS_ASYNCPG = True
+except ImportError:
+    HAS_ASYNCPG = False
+
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+REFRESHABLE_VIEWS = {"tenant_stats"}
+STATS_REFRESH_DEBOUNCE = float(os.getenv("STATS_REFRESH_DEBOUNCE", "2"))  # seconds
+# How often a worker that isn't the refresher checks whether it should take over
+STATS_REFRESHER_RETRY = float(os.getenv("STATS_REFRESHER_RETRY", "30"))  # seconds
+# LISTEN and session advisory locks need a direct connection; set this when
+# DATABASE_URL goes through PgBouncer in transaction pooling mode
+STATS_LISTEN_URL = os.getenv("STATS_LISTEN_URL")
+
+# Session advisory lock held by the one worker that refreshes the views
+STATS_REFRESHER_LOCK = 7_301_190_001
+
+class StatsRefresher:
+    """Coalesces refresh_stats notifications into concurrent view refreshes
+
+    Every worker starts one, but only the worker holding STATS_REFRESHER_LOCK
+    listens and refreshes, so a burst of bet writes costs one refresh rather
+    than one per worker. The others retry the lock and take over if that
+    worker exits.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._pending: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start competing for the refresher role (PostgreSQL only)"""
+        if not db_manager.is_postgres or not HAS_ASYNCPG or self._task:
+            return
+
+        self._task = asyncio.create_task(self._run())
+
+    def _on_notify(self, conn, pid, channel, payload):
+        if payload in REFRESHABLE_VIEWS:
+            self._pending.add(payload)
+            self._wakeup.set()
+
+    async def _acquire(self) -> bool:
+        """Open a dedicated connection and take the refresher lock, or close it again"""
+        conn = await asyncpg.connect(STATS_LISTEN_URL or db_manager.database_url)
+        try:
+            if await conn.fetchval("SELECT pg_try_advisory_lock($1)", STATS_REFRESHER_LOCK):
+                await conn.add_listener('refresh_stats', self._on_notify)
+                self._conn = conn
+                return True
+        except BaseException:
+            await conn.close()
+            raise
+
+        await conn.close()
+        return False
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._acquire():
+                    logger.info("Stats refresher started")
+                    await self._refresh_loop()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stats refresher failed: {e}")
+            finally:
+                await self._close()
+
+            await asyncio.sleep(STATS_REFRESHER_RETRY)
+
+    async def _refresh_loop(self):
+        while not self._conn.is_closed():
+            # Wake up periodically so a dropped connection is noticed
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), STATS_REFRESHER_RETRY)
+            except asyncio.TimeoutError:
+                continue
+            # Let a burst of bet writes collapse into a single refresh
+            await asyncio.sleep(STATS_REFRESH_DEBOUNCE)
+            self._wakeup.clear()
+            views, self._pending = self._pending, set()
+
+            for view in views:
+                try:
+                    await self._conn.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                except Exception as e:
+                    logger.error(f"Failed to refresh {view}: {e}")
+
+    async def _close(self):
+        """Close the dedicated connection, which also releases the lock"""
+        if self._conn is None:
+            return
+
+        conn, self._conn = self._conn, None
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.error(f"Failed to close stats listener: {e}")
+
+    async def stop(self):
+        """Stop refreshing and close the listener connection"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.wait([self._task])
+            self._task = None
+
+        await self._close()
+
+# Global refresher instance
+stats_refresher = StatsRefresher()
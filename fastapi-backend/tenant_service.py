@@ -1,7 +1,9 @@
 """
 Tenant management service for multi-tenant SaaS
 """
+import os
 import re
+import asyncio
 import secrets
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -9,13 +11,18 @@ import logging
 from fastapi import HTTPException, status
 
 from .models import (
-    TenantCreate, TenantResponse, TenantRecord, UserRecord,
+    TenantCreate, TenantResponse, TenantRecord, TenantCacheEntry, UserRecord,
     TenantSettings, DEFAULT_CATEGORIES, TenantStatus
 )
 from .database import db_manager
+from .cache import TTLCache, get_redis
 
 logger = logging.getLogger(__name__)
 
+TENANT_CACHE_TTL = int(os.getenv("TENANT_CACHE_TTL", "60"))  # seconds
+# Unknown subdomains are remembered briefly so scans of random hosts don't each hit the database
+TENANT_MISS_CACHE_TTL = int(os.getenv("TENANT_MISS_CACHE_TTL", "5"))  # seconds
+
 class TenantService:
     """Service for managing tenants and their lifecycle"""
     
@@ -27,6 +34,50 @@ class TenantService:
             'assets', 'static', 'media', 'files', 'images', 'uploads',
             'dashboard', 'portal', 'console', 'manage', 'control'
         }
+        # Fallback when Redis isn't configured (per-process only)
+        self._tenant_cache = TTLCache(maxsize=1024, ttl=TENANT_CACHE_TTL)
+        self._missing_tenants = TTLCache(maxsize=10000, ttl=TENANT_MISS_CACHE_TTL)
+        # subdomain -> lookup in progress, shared by concurrent cache misses
+        self._tenant_lookups: Dict[str, asyncio.Task] = {}
+    
+    async def _get_cached_tenant(self, subdomain: str) -> Optional[TenantRecord]:
+        """Look up a tenant in Redis, or the local cache without Redis"""
+        redis = get_redis()
+        if redis is None:
+            return self._tenant_cache.get(subdomain)
+        
+        try:
+            raw = await redis.get(f"tenant:{subdomain}")
+            if not raw:
+                return None
+            # Parsed back through the model so datetimes come back as datetimes
+            return TenantRecord(TenantCacheEntry.model_validate_json(raw).model_dump())
+        except Exception as e:
+            logger.warning(f"Tenant cache read failed: {e}")
+            return None
+    
+    async def _cache_tenant(self, subdomain: str, tenant_row) -> None:
+        """Store a tenant row under its subdomain"""
+        redis = get_redis()
+        if redis is None:
+            self._tenant_cache.set(subdomain, TenantRecord(tenant_row))
+            return
+        
+        try:
+            entry = TenantCacheEntry.model_validate({**dict(tenant_row), 'id': str(tenant_row['id'])})
+            await redis.set(f"tenant:{subdomain}", entry.model_dump_json(), ex=TENANT_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Tenant cache write failed: {e}")
+    
+    async def _invalidate_tenant(self, subdomain: str) -> None:
+        """Drop a cached tenant after it changes"""
+        self._tenant_cache.pop(subdomain)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.delete(f"tenant:{subdomain}")
+            except Exception as e:
+                logger.warning(f"Tenant cache invalidation failed: {e}")
     
     async def validate_subdomain(self, subdomain: str) -> bool:
         """Validate subdomain availability and format"""
@@ -44,6 +95,10 @@ class TenantService:
         if subdomain in self.reserved_subdomains:
             return False
         
+        # A cached tenant means the subdomain is taken
+        if await self._get_cached_tenant(subdomain) is not None:
+            return False
+        
         # Database availability check
         try:
             async with db_manager.get_connection() as conn:
@@ -57,14 +112,39 @@ class TenantService:
     
     async def get_tenant_by_subdomain(self, subdomain: str) -> Optional[TenantRecord]:
         """Get tenant by subdomain"""
+        subdomain = subdomain.lower()
+        cached = await self._get_cached_tenant(subdomain)
+        if cached is not None:
+            return cached
+        
+        if self._missing_tenants.get(subdomain):
+            return None
+        
+        # A burst of requests for an uncached tenant runs a single query
+        lookup = self._tenant_lookups.get(subdomain)
+        if lookup is None:
+            lookup = self._tenant_lookups[subdomain] = asyncio.create_task(
+                self._load_tenant(subdomain)
+            )
+            lookup.add_done_callback(lambda _: self._tenant_lookups.pop(subdomain, None))
+        
+        # Shielded so one caller disconnecting doesn't cancel the others' lookup
+        return await asyncio.shield(lookup)
+    
+    async def _load_tenant(self, subdomain: str) -> Optional[TenantRecord]:
+        """Fetch a tenant from the database and cache the result"""
         try:
             async with db_manager.get_connection() as conn:
                 tenant_row = await conn.fetchrow("""
                     SELECT * FROM get_tenant_by_subdomain($1)
-                """, subdomain.lower())
+                """, subdomain)
                 
                 if tenant_row:
-                    return TenantRecord(tenant_row)
+                    tenant = TenantRecord(tenant_row)
+                    await self._cache_tenant(subdomain, tenant_row)
+                    return tenant
+                
+                self._missing_tenants.set(subdomain, True)
                 return None
                 
         except Exception as e:
@@ -128,6 +208,9 @@ class TenantService:
                 """, user_id)
                 user = UserRecord(user_row)
                 
+                # Requests that raced the signup may have cached the subdomain as unknown
+                self._missing_tenants.pop(tenant.subdomain)
+                
                 logger.info(f"Created tenant '{tenant.subdomain}' with owner '{user.email}'")
                 
                 return {
@@ -162,6 +245,7 @@ class TenantService:
                         detail="Tenant not found"
                     )
                 
+                await self._invalidate_tenant(updated_tenant['subdomain'])
                 logger.info(f"Updated settings for tenant {tenant_id}")
                 return TenantRecord(updated_tenant)
                 
@@ -191,6 +275,7 @@ class TenantService:
                         detail="Tenant not found"
                     )
                 
+                await self._invalidate_tenant(updated_tenant['subdomain'])
                 logger.info(f"Updated status for tenant {tenant_id} to {status}")
                 return TenantRecord(updated_tenant)
                 
@@ -264,39 +349,38 @@ class TenantService:
         """Get comprehensive tenant statistics"""
         try:
             async with db_manager.get_tenant_connection(tenant_id) as conn:
-                # Get basic stats
-                stats = await conn.fetchrow("""
-                    SELECT 
-                        COUNT(DISTINCT b.id) as total_bets,
-                        COUNT(DISTINCT b.id) FILTER (WHERE b.is_validated = true) as validated_bets,
-                        COALESCE(SUM(b.amount), 0) as total_amount,
-                        COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount,
-                        COUNT(DISTINCT b.user_email) as unique_users,
-                        COUNT(DISTINCT rc.id) as active_categories
-                    FROM tenants t
-                    LEFT JOIN bets b ON t.id = b.tenant_id  
-                    LEFT JOIN raffle_categories rc ON t.id = rc.tenant_id AND rc.is_active = true
-                    WHERE t.id = $1
-                    GROUP BY t.id
-                """, tenant_id)
-                
-                # Get category breakdown
-                categories = await conn.fetch("""
+                # Tenant and per-category totals come from the rollups, which the
+                # same triggers on bets keep current, so the category figures always
+                # add up to the totals; only distinct bettors use the stats view.
+                # Overall and per-category figures share one round trip: one row per
+                # active category carrying the tenant totals, or a single row with
+                # NULL category columns when there are none
+                rows = await conn.fetch("""
                     SELECT 
+                        r.total_bets,
+                        r.validated_bets,
+                        r.total_amount as tenant_total_amount,
+                        r.validated_amount as tenant_validated_amount,
+                        ts.unique_users,
                         rc.id,
                         rc.category_name,
                         rc.category_key,
-                        COUNT(b.id) as bet_count,
-                        COUNT(b.id) FILTER (WHERE b.is_validated = true) as validated_count,
-                        COALESCE(SUM(b.amount), 0) as total_amount,
-                        COALESCE(SUM(b.amount) FILTER (WHERE b.is_validated = true), 0) as validated_amount
-                    FROM raffle_categories rc
-                    LEFT JOIN bets b ON rc.id = b.category_id
-                    WHERE rc.tenant_id = $1 AND rc.is_active = true
-                    GROUP BY rc.id, rc.category_name, rc.category_key
+                        cs.bet_count,
+                        cs.validated_count,
+                        cs.total_amount,
+                        cs.validated_amount
+                    FROM tenants t
+                    LEFT JOIN tenant_stats_rollup r ON r.tenant_id = t.id
+                    LEFT JOIN tenant_stats ts ON ts.tenant_id = t.id
+                    LEFT JOIN raffle_categories rc ON rc.tenant_id = t.id AND rc.is_active = true
+                    LEFT JOIN category_stats_rollup cs ON cs.category_id = rc.id
+                    WHERE t.id = $1
                     ORDER BY rc.display_order
                 """, tenant_id)
                 
+                stats = rows[0] if rows else {}
+                categories = [row for row in rows if row['id'] is not None]
+                
                 # Get recent bets
                 recent_bets = await conn.fetch("""
                     SELECT b.*, rc.category_name
@@ -308,12 +392,12 @@ class TenantService:
                 """, tenant_id)
                 
                 return {
-                    'total_bets': stats['total_bets'] or 0,
-                    'validated_bets': stats['validated_bets'] or 0,
-                    'total_amount': float(stats['total_amount'] or 0),
-                    'validated_amount': float(stats['validated_amount'] or 0),
-                    'unique_users': stats['unique_users'] or 0,
-                    'active_categories': stats['active_categories'] or 0,
+                    'total_bets': stats.get('total_bets') or 0,
+                    'validated_bets': stats.get('validated_bets') or 0,
+                    'total_amount': float(stats.get('tenant_total_amount') or 0),
+                    'validated_amount': float(stats.get('tenant_validated_amount') or 0),
+                    'unique_users': stats.get('unique_users') or 0,
+                    'active_categories': len(categories),
                     'categories': [
                         {
                             'id': str(cat['id']),
@@ -334,7 +418,7 @@ class TenantService:
                             'bet_value': bet['bet_value'],
                             'amount': float(bet['amount']),
                             'is_validated': bet['is_validated'],
-                            'created_at': bet['created_at'].isoformat()
+                            'created_at': bet['created_at']
                         } for bet in recent_bets
                     ]
                 }
@@ -392,16 +476,17 @@ class TenantService:
                 params.append(offset)
                 offset_param = f"${param_count}"
                 
+                # Bet totals come from the trigger-maintained rollup and users are
+                # counted per tenant, so no bets are scanned and the two joins
+                # can't fan out into each other's counts
                 query = f"""
                     SELECT t.*, 
-                           COUNT(DISTINCT u.id) as user_count,
-                           COUNT(DISTINCT b.id) as bet_count,
-                           COALESCE(SUM(b.amount), 0) as total_amount
+                           (SELECT COUNT(*) FROM users u WHERE u.tenant_id = t.id) as user_count,
+                           r.total_bets as bet_count,
+                           r.total_amount
                     FROM tenants t
-                    LEFT JOIN users u ON t.id = u.tenant_id
-                    LEFT JOIN bets b ON t.id = b.tenant_id
+                    LEFT JOIN tenant_stats_rollup r ON r.tenant_id = t.id
                     {where_clause}
-                    GROUP BY t.id, t.subdomain, t.name, t.owner_email, t.status, t.subscription_plan, t.created_at, t.updated_at, t.settings
                     ORDER BY t.created_at DESC
                     LIMIT {limit_param} OFFSET {offset_param}
                 """
@@ -416,7 +501,7 @@ class TenantService:
                         'owner_email': row['owner_email'],
                         'status': row['status'],
                         'subscription_plan': row['subscription_plan'],
-                        'created_at': row['created_at'].isoformat(),
+                        'created_at': row['created_at'],
                         'user_count': row['user_count'] or 0,
                         'bet_count': row['bet_count'] or 0,
                         'total_amount': float(row['total_amount'] or 0)
@@ -0,0 +1,228 @@
+"""Tests for BetIngestor batching, failure isolation and shutdown"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+import bet_ingestor
+from bet_ingestor import BetIngestor, CategoryChangedError
+
+TENANT_1 = "11111111-1111-1111-1111-111111111111"
+TENANT_2 = "22222222-2222-2222-2222-222222222222"
+CATEGORY = str(uuid.uuid4())
+STALE_CATEGORY = str(uuid.uuid4())
+
+def bet(email: str = "guest@example.com", category: str = CATEGORY):
+    return (category, "Guest", email, "7 lbs", 5.0)
+
+class FakeConnection:
+    """Records INSERT batches and commits them only when their transaction succeeds"""
+
+    def __init__(self, db: "FakeDatabase", tenant_id: str):
+        self.db = db
+        self.tenant_id = tenant_id
+        self._pending = None
+
+    @asynccontextmanager
+    async def transaction(self):
+        self._pending = []
+        try:
+            yield
+        except BaseException:
+            self.db.rolled_back += 1
+            raise
+        else:
+            self.db.committed.extend(self._pending)
+        finally:
+            self._pending = None
+
+    async def execute(self, query, tenant_id, ids, category_ids, names, emails, values, amounts):
+        assert tenant_id == self.tenant_id
+        self.db.inserts.append((tenant_id, list(ids)))
+        if any(email in self.db.rejected_emails for email in emails):
+            raise ValueError("value too long for type character varying(255)")
+
+        # The real INSERT ... SELECT joins on the category, dropping stale rows
+        inserted = [
+            (tenant_id, bet_id, email)
+            for bet_id, category_id, email in zip(ids, category_ids, emails)
+            if category_id != STALE_CATEGORY
+        ]
+        self._pending.extend(inserted)
+        return f"INSERT 0 {len(inserted)}"
+
+class FakeDatabase:
+    def __init__(self):
+        self.inserts = []
+        self.committed = []
+        self.rolled_back = 0
+        self.rejected_emails = set()
+
+    @asynccontextmanager
+    async def get_tenant_connection(self, tenant_id: str):
+        yield FakeConnection(self, tenant_id)
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(bet_ingestor, "db_manager", db)
+    monkeypatch.setattr(bet_ingestor, "BET_INGEST_WAIT_TIME", 0.02)
+    return db
+
+def test_submit_without_start_writes_straight_through(db):
+    ingestor = BetIngestor()
+
+    ids = asyncio.run(ingestor.submit(TENANT_1, [bet(), bet()]))
+
+    assert len(ids) == 2
+    assert db.inserts == [(TENANT_1, ids)]
+    assert [row[1] for row in db.committed] == ids
+
+def test_concurrent_submissions_share_one_insert(db):
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        try:
+            return await asyncio.gather(*(
+                ingestor.submit(TENANT_1, [bet(f"guest{i}@example.com")])
+                for i in range(5)
+            ))
+        finally:
+            await ingestor.stop()
+
+    results = asyncio.run(run())
+
+    assert len(db.inserts) == 1
+    # Each caller gets back only the ids of its own bets
+    assert db.inserts[0][1] == [ids[0] for ids in results]
+    assert len(db.committed) == 5
+
+def test_batch_is_split_by_tenant(db):
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        try:
+            return await asyncio.gather(
+                ingestor.submit(TENANT_1, [bet()]),
+                ingestor.submit(TENANT_2, [bet(), bet()]),
+                ingestor.submit(TENANT_1, [bet()]),
+            )
+        finally:
+            await ingestor.stop()
+
+    first, second, third = asyncio.run(run())
+
+    assert sorted(db.inserts) == sorted([
+        (TENANT_1, first + third),
+        (TENANT_2, second),
+    ])
+
+def test_batch_is_capped_at_max_rows(db, monkeypatch):
+    monkeypatch.setattr(bet_ingestor, "BET_INGEST_MAX_ROWS", 2)
+
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        try:
+            await asyncio.gather(*(ingestor.submit(TENANT_1, [bet()]) for _ in range(4)))
+        finally:
+            await ingestor.stop()
+
+    asyncio.run(run())
+
+    assert [len(ids) for _, ids in db.inserts] == [2, 2]
+
+def test_failing_submission_does_not_fail_the_rest_of_the_batch(db):
+    db.rejected_emails.add("x" * 300)
+
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        try:
+            return await asyncio.gather(
+                ingestor.submit(TENANT_1, [bet("a@example.com")]),
+                ingestor.submit(TENANT_1, [bet("b@example.com"), bet("x" * 300)]),
+                ingestor.submit(TENANT_1, [bet("c@example.com")]),
+                return_exceptions=True,
+            )
+        finally:
+            await ingestor.stop()
+
+    first, failed, third = asyncio.run(run())
+
+    assert isinstance(failed, ValueError)
+    # The failed submission is all-or-nothing: its valid bet is not written either
+    assert sorted(email for _, _, email in db.committed) == ["a@example.com", "c@example.com"]
+    assert [row[1] for row in db.committed if row[2] == "a@example.com"] == first
+    assert [row[1] for row in db.committed if row[2] == "c@example.com"] == third
+
+def test_stale_category_rejects_the_submission(db):
+    ingestor = BetIngestor()
+
+    with pytest.raises(CategoryChangedError):
+        asyncio.run(ingestor.submit(TENANT_1, [bet(), bet(category=STALE_CATEGORY)]))
+
+    assert db.committed == []
+    assert db.rolled_back == 1
+
+def test_stale_category_in_batch_only_fails_its_submission(db):
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        try:
+            return await asyncio.gather(
+                ingestor.submit(TENANT_1, [bet("a@example.com")]),
+                ingestor.submit(TENANT_1, [bet("b@example.com", category=STALE_CATEGORY)]),
+                return_exceptions=True,
+            )
+        finally:
+            await ingestor.stop()
+
+    ok, stale = asyncio.run(run())
+
+    assert isinstance(stale, CategoryChangedError)
+    assert [row[1] for row in db.committed] == ok
+
+def test_stop_writes_queued_bets_then_rejects_new_ones(db):
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        pending = [
+            asyncio.create_task(ingestor.submit(TENANT_1, [bet()]))
+            for _ in range(3)
+        ]
+        # Let the submissions reach the queue before shutting down
+        await asyncio.sleep(0)
+        await ingestor.stop()
+
+        with pytest.raises(RuntimeError):
+            await ingestor.submit(TENANT_1, [bet()])
+        return await asyncio.gather(*pending)
+
+    results = asyncio.run(run())
+
+    assert len(db.committed) == 3
+    assert sorted(row[1] for row in db.committed) == sorted(ids[0] for ids in results)
+
+def test_stop_fails_bets_that_could_not_be_written_in_time(db, monkeypatch):
+    monkeypatch.setattr(bet_ingestor, "BET_INGEST_SHUTDOWN_TIMEOUT", 0.01)
+
+    @asynccontextmanager
+    async def hanging_connection(tenant_id):
+        await asyncio.sleep(10)
+        yield
+
+    monkeypatch.setattr(db, "get_tenant_connection", hanging_connection)
+
+    async def run():
+        ingestor = BetIngestor()
+        await ingestor.start()
+        pending = asyncio.create_task(ingestor.submit(TENANT_1, [bet()]))
+        await asyncio.sleep(0)
+        await ingestor.stop()
+        return await asyncio.gather(pending, return_exceptions=True)
+
+    (result,) = asyncio.run(run())
+
+    assert isinstance(result, RuntimeError)
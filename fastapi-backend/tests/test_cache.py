@@ -0,0 +1,154 @@
+"""Tests for the TTL cache and the shared Redis/local cache helpers"""
+import asyncio
+
+import pytest
+
+import cache
+from cache import TTLCache, get_shared, set_shared, invalidate_shared
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+class FakeRedis:
+    def __init__(self, fail: bool = False):
+        self.data = {}
+        self.expiry = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    async def delete(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data.pop(key, None)
+
+def test_get_returns_default_when_missing():
+    c = TTLCache()
+
+    assert c.get("missing") is None
+    assert c.get("missing", "fallback") == "fallback"
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache(ttl=30)
+    c.set("key", "value")
+
+    clock.now += 29
+    assert c.get("key") == "value"
+
+    clock.now += 1
+    assert c.get("key") is None
+    assert len(c) == 0
+
+def test_per_entry_ttl_overrides_default(clock):
+    c = TTLCache(ttl=30)
+    c.set("short", 1, ttl=5)
+    c.set("long", 2)
+
+    clock.now += 5
+    assert c.get("short") is None
+    assert c.get("long") == 2
+
+def test_least_recently_used_entry_is_evicted():
+    c = TTLCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    # Reading "a" makes "b" the least recently used
+    assert c.get("a") == 1
+
+    c.set("c", 3)
+
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+    assert len(c) == 2
+
+def test_set_refreshes_existing_entry(clock):
+    c = TTLCache(ttl=10)
+    c.set("key", "old")
+    clock.now += 8
+    c.set("key", "new")
+
+    clock.now += 8
+    assert c.get("key") == "new"
+
+def test_pop_and_clear():
+    c = TTLCache()
+    c.set("a", 1)
+    c.set("b", 2)
+
+    assert c.pop("a") == 1
+    assert c.pop("a", "gone") == "gone"
+    assert c.get("a") is None
+
+    c.clear()
+    assert len(c) == 0
+
+def test_shared_helpers_use_local_cache_without_redis(monkeypatch):
+    monkeypatch.setattr(cache, "get_redis", lambda: None)
+    local = TTLCache()
+
+    async def run():
+        assert await get_shared("stats:1", local) is None
+        await set_shared("stats:1", b"{}", local)
+        assert await get_shared("stats:1", local) == b"{}"
+        await invalidate_shared("stats:1", local)
+        assert await get_shared("stats:1", local) is None
+
+    asyncio.run(run())
+
+def test_shared_helpers_use_redis_when_configured(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis", lambda: redis)
+    local = TTLCache(ttl=15)
+
+    async def run():
+        await set_shared("stats:1", b"{}", local)
+        assert redis.data == {"stats:1": b"{}"}
+        assert redis.expiry == {"stats:1": 15}
+        # Nothing is kept per worker, so every worker reads the same entry
+        assert len(local) == 0
+        assert await get_shared("stats:1", local) == b"{}"
+
+        await invalidate_shared("stats:1", local)
+        assert await get_shared("stats:1", local) is None
+
+    asyncio.run(run())
+
+def test_invalidate_also_drops_local_entry(monkeypatch):
+    monkeypatch.setattr(cache, "get_redis", lambda: FakeRedis())
+    local = TTLCache()
+    local.set("stats:1", b"stale")
+
+    asyncio.run(invalidate_shared("stats:1", local))
+
+    assert local.get("stats:1") is None
+
+def test_redis_failures_degrade_to_cache_miss(monkeypatch):
+    monkeypatch.setattr(cache, "get_redis", lambda: FakeRedis(fail=True))
+    local = TTLCache()
+
+    async def run():
+        await set_shared("stats:1", b"{}", local)
+        assert await get_shared("stats:1", local) is None
+        await invalidate_shared("stats:1", local)
+
+    asyncio.run(run())
@@ -0,0 +1,138 @@
+"""Tests for WriteDebouncer"""
+import asyncio
+
+import pytest
+
+from debounce import WriteDebouncer
+
+DELAY = 0.01
+
+class RecordingWriter:
+    def __init__(self, duration: float = 0, error: Exception = None):
+        self.calls = []
+        self.duration = duration
+        self.error = error
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, key, value):
+        self.calls.append((key, value))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.duration)
+            if self.error is not None:
+                raise self.error
+            return {"key": key, "value": value}
+        finally:
+            self.active -= 1
+
+def merge_dicts(pending, value):
+    return {**pending, **value}
+
+def test_burst_is_written_once_with_merged_value():
+    writer = RecordingWriter()
+    debouncer = WriteDebouncer(writer, merge=merge_dicts, delay=DELAY)
+
+    async def run():
+        return await asyncio.gather(
+            debouncer.submit("tenant-1", {"title": "A"}),
+            debouncer.submit("tenant-1", {"color": "blue"}),
+            debouncer.submit("tenant-1", {"title": "B"}),
+        )
+
+    results = asyncio.run(run())
+
+    assert writer.calls == [("tenant-1", {"title": "B", "color": "blue"})]
+    # Every caller in the burst gets the result of the one write
+    assert results == [{"key": "tenant-1", "value": {"title": "B", "color": "blue"}}] * 3
+
+def test_latest_value_wins_without_merge():
+    writer = RecordingWriter()
+    debouncer = WriteDebouncer(writer, delay=DELAY)
+
+    async def run():
+        await asyncio.gather(
+            debouncer.submit("tenant-1", 1),
+            debouncer.submit("tenant-1", 2),
+        )
+
+    asyncio.run(run())
+
+    assert writer.calls == [("tenant-1", 2)]
+
+def test_separate_bursts_and_keys_are_written_separately():
+    writer = RecordingWriter()
+    debouncer = WriteDebouncer(writer, delay=DELAY)
+
+    async def run():
+        await asyncio.gather(
+            debouncer.submit("tenant-1", "a"),
+            debouncer.submit("tenant-2", "b"),
+        )
+        await debouncer.submit("tenant-1", "c")
+
+    asyncio.run(run())
+
+    assert sorted(writer.calls) == [("tenant-1", "a"), ("tenant-1", "c"), ("tenant-2", "b")]
+
+def test_each_caller_gets_its_own_exception():
+    writer = RecordingWriter(error=ValueError("write failed"))
+    debouncer = WriteDebouncer(writer, delay=DELAY)
+
+    async def run():
+        return await asyncio.gather(
+            debouncer.submit("tenant-1", 1),
+            debouncer.submit("tenant-1", 2),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run())
+
+    assert len(writer.calls) == 1
+    assert isinstance(first, ValueError) and isinstance(second, ValueError)
+    assert str(first) == str(second) == "write failed"
+    assert first is not second
+
+def test_failed_write_does_not_block_later_bursts():
+    writer = RecordingWriter(error=ValueError("write failed"))
+    debouncer = WriteDebouncer(writer, delay=DELAY)
+
+    async def run():
+        with pytest.raises(ValueError):
+            await debouncer.submit("tenant-1", 1)
+        writer.error = None
+        return await debouncer.submit("tenant-1", 2)
+
+    assert asyncio.run(run()) == {"key": "tenant-1", "value": 2}
+
+def test_writes_for_a_key_never_overlap():
+    # Each write outlasts the quiet period, so the second burst is ready
+    # while the first is still being written
+    writer = RecordingWriter(duration=DELAY * 5)
+    debouncer = WriteDebouncer(writer, delay=DELAY)
+
+    async def run():
+        first = asyncio.create_task(debouncer.submit("tenant-1", 1))
+        await asyncio.sleep(DELAY * 2)
+        second = asyncio.create_task(debouncer.submit("tenant-1", 2))
+        await asyncio.gather(first, second)
+
+    asyncio.run(run())
+
+    assert writer.calls == [("tenant-1", 1), ("tenant-1", 2)]
+    assert writer.max_active == 1
+
+def test_cancelled_caller_does_not_affect_others():
+    writer = RecordingWriter()
+    debouncer = WriteDebouncer(writer, delay=DELAY)
+
+    async def run():
+        abandoned = asyncio.create_task(debouncer.submit("tenant-1", 1))
+        kept = asyncio.create_task(debouncer.submit("tenant-1", 2))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        return await kept
+
+    assert asyncio.run(run()) == {"key": "tenant-1", "value": 2}
+    assert writer.calls == [("tenant-1", 2)]
@@ -0,0 +1,45 @@
+"""Tests for the bets keyset cursors"""
+import base64
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination import encode_bets_cursor, decode_bets_cursor
+
+def _bet():
+    return {
+        "created_at": datetime(2024, 5, 17, 9, 30, 15, 123456, tzinfo=timezone.utc),
+        "id": uuid.uuid4(),
+    }
+
+def test_cursor_round_trips_keyset():
+    bet = _bet()
+
+    created_at, bet_id = decode_bets_cursor(encode_bets_cursor(bet))
+
+    assert created_at == bet["created_at"]
+    assert bet_id == str(bet["id"])
+
+def test_cursor_is_url_safe():
+    for _ in range(50):
+        cursor = encode_bets_cursor(_bet())
+        assert not set(cursor) & set("+/=")
+
+def test_cursor_accepts_string_ids():
+    bet = {**_bet(), "id": str(uuid.uuid4())}
+
+    assert decode_bets_cursor(encode_bets_cursor(bet))[1] == bet["id"]
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    "abc",
+    base64.urlsafe_b64encode(b"2024-05-17T09:30:15").decode(),
+    base64.urlsafe_b64encode(b"2024-05-17T09:30:15|not-a-uuid").decode(),
+    base64.urlsafe_b64encode(f"yesterday|{uuid.uuid4()}".encode()).decode(),
+    base64.urlsafe_b64encode(f"a|b|{uuid.uuid4()}".encode()).decode(),
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_bets_cursor(cursor)